@@ -0,0 +1,274 @@
+"""
+Degrees-of-separation statistics for a whole dataset.
+
+Computes connected component sizes, the distribution of shortest-path
+lengths over all ordered pairs of connected people, and every person's
+eccentricity (the most degrees separating them from anybody they are
+connected to).
+
+Breadth-first searches run from many sources at once: each person holds
+a bitmask with one bit per source, so one pass over the graph advances
+`width` searches by a level. Batches of sources are searched in a
+process pool, and each finished batch is appended to the output file
+as one JSON line, so an interrupted run resumes where it stopped.
+
+Usage: python analytics.py [-o OUTPUT] [-w WORKERS] [--width W] [directory]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from array import array
+
+from graph import INT, Graph
+
+# Graph shared by the worker processes
+graph = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute degrees-of-separation statistics."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-o", "--output", default="analytics.jsonl",
+                        help="results file, resumed if it exists")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--width", type=int, default=64,
+                        help="number of sources searched together")
+    args = parser.parse_args()
+
+    global graph
+    graph = Graph.from_directory(args.directory)
+    summary = analyze(args.directory, args.output, args.workers, args.width)
+
+    print(f"People: {graph.num_people()}")
+    print(f"Components: {sum(summary['component_sizes'].values())}")
+    print(f"Largest component: {summary['largest_component']}")
+    for distance, count in summary["histogram"].items():
+        print(f"{distance} degrees: {count} pairs")
+
+
+def analyze(directory, output, workers=1, width=64):
+    """
+    Runs or resumes the analysis of `graph`, whose data is in
+    `directory`, appending results to the `output` file.
+    Returns the summary record.
+    """
+    labels, sizes = components(graph)
+    tasks = list(source_batches(labels, sizes, width))
+
+    header = {
+        "type": "header",
+        "people": graph.num_people(),
+        "movies": graph.num_movies(),
+        "width": width,
+    }
+    records = read_records(output)
+    if records and records[0] != header:
+        raise Exception(f"{output} was written for other data or settings")
+
+    done = {record["task"] for record in records if record["type"] == "batch"}
+    with open(output, "a", encoding="utf-8") as f:
+        if not records:
+            write_record(f, header)
+
+        todo = [task for task in tasks if task[0] not in done]
+        if workers > 1 and len(todo) > 1:
+            with multiprocessing.Pool(
+                workers, initializer=init_worker, initargs=(directory,)
+            ) as pool:
+                for record in pool.imap_unordered(search_batch, todo):
+                    write_record(f, record)
+                    records.append(record)
+        else:
+            for task in todo:
+                record = search_batch(task)
+                write_record(f, record)
+                records.append(record)
+
+        summary = summarize(records, sizes)
+        if not any(record["type"] == "summary" for record in records):
+            write_record(f, summary)
+    return summary
+
+
+def components(graph):
+    """
+    Labels each person with the number of their connected component,
+    numbered in order of each component's first person.
+    Returns the labels and the list of component sizes.
+    """
+    labels = array(INT, [-1]) * graph.num_people()
+    sizes = []
+    seen_movies = bytearray(graph.num_movies())
+    for start in range(graph.num_people()):
+        if labels[start] != -1:
+            continue
+        label = len(sizes)
+        labels[start] = label
+        size = 1
+        stack = [start]
+        while stack:
+            person = stack.pop()
+            for movie in graph.movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for star in graph.stars_of(movie):
+                    if labels[star] == -1:
+                        labels[star] = label
+                        size += 1
+                        stack.append(star)
+        sizes.append(size)
+    return labels, sizes
+
+
+def source_batches(labels, sizes, width):
+    """
+    Yields (task, component, sources) batches of at most `width` people
+    from the same component, skipping people with no connections.
+    """
+    members = {}
+    for person, label in enumerate(labels):
+        if sizes[label] > 1:
+            members.setdefault(label, []).append(person)
+    task = 0
+    for label in sorted(members):
+        people = members[label]
+        for start in range(0, len(people), width):
+            yield task, label, people[start:start + width]
+            task += 1
+
+
+def search_batch(task):
+    """
+    Runs a breadth-first search from each source of a batch at once.
+
+    Returns a record with the number of (source, person) pairs found at
+    each distance and the eccentricity of each source.
+    """
+    number, label, sources = task
+    person_offsets, person_movies = graph.person_offsets, graph.person_movies
+    movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+
+    # Bit i of each mask stands for the search from sources[i]
+    visited = {}
+    for i, source in enumerate(sources):
+        visited[source] = visited.get(source, 0) | 1 << i
+    frontier = dict(visited)
+    movie_visited = {}
+    eccentricity = [0] * len(sources)
+    histogram = {}
+
+    level = 0
+    while frontier:
+        level += 1
+
+        # Spread the searches from people to their movies
+        movie_frontier = {}
+        for person, mask in frontier.items():
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                new = mask & ~movie_visited.get(movie, 0)
+                if new:
+                    movie_frontier[movie] = movie_frontier.get(movie, 0) | new
+        for movie, mask in movie_frontier.items():
+            movie_visited[movie] = movie_visited.get(movie, 0) | mask
+
+        # And from the movies to their stars
+        next_frontier = {}
+        for movie, mask in movie_frontier.items():
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                star = movie_stars[j]
+                new = mask & ~visited.get(star, 0)
+                if new:
+                    next_frontier[star] = next_frontier.get(star, 0) | new
+
+        reached = 0
+        count = 0
+        for star, mask in next_frontier.items():
+            visited[star] = visited.get(star, 0) | mask
+            reached |= mask
+            count += mask.bit_count()
+        if count:
+            histogram[level] = count
+
+        # Searches still reaching new people are at least this eccentric
+        while reached:
+            low = reached & -reached
+            eccentricity[low.bit_length() - 1] = level
+            reached ^= low
+        frontier = next_frontier
+
+    return {
+        "type": "batch",
+        "task": number,
+        "component": label,
+        "histogram": {str(d): count for d, count in histogram.items()},
+        "eccentricity": [
+            [graph.person_ids[source], eccentricity[i]]
+            for i, source in enumerate(sources)
+        ],
+    }
+
+
+def summarize(records, sizes):
+    """
+    Combines the batch records into the summary record.
+    """
+    histogram = {}
+    for record in records:
+        if record["type"] == "batch":
+            for distance, count in record["histogram"].items():
+                histogram[distance] = histogram.get(distance, 0) + count
+    component_sizes = {}
+    for size in sizes:
+        component_sizes[size] = component_sizes.get(size, 0) + 1
+    return {
+        "type": "summary",
+        "histogram": dict(sorted(histogram.items(), key=lambda i: int(i[0]))),
+        "component_sizes": {str(size): count
+                            for size, count in sorted(component_sizes.items())},
+        "largest_component": max(sizes, default=0),
+    }
+
+
+def read_records(filename):
+    """
+    Returns the records already in `filename`, truncating the file
+    after the last complete record.
+    """
+    if not os.path.exists(filename):
+        return []
+    records = []
+    end = 0
+    with open(filename, "rb") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                records.pop()
+                break
+            end += len(line)
+    with open(filename, "r+b") as f:
+        f.truncate(end)
+    return records
+
+
+def write_record(f, record):
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+
+
+def init_worker(directory):
+    global graph
+    graph = Graph.from_directory(directory)
+
+
+if __name__ == "__main__":
+    main()
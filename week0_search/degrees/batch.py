@@ -0,0 +1,189 @@
+"""
+Answers many degrees-of-separation queries in one run.
+
+Reads (source, target) pairs from a CSV file with `source` and `target`
+columns or from a JSON Lines file of {"source": ..., "target": ...}
+objects, where each person is given by IMDB id or by name. Writes one
+JSON object per query, in input order, as results become available.
+
+Usage: python batch.py [-o OUTPUT] [-w WORKERS] [-c PAIRS]
+                       queries [directory]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+
+from graph import Graph, trace_path
+
+# Graph shared by the worker processes
+graph = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer a file of degrees-of-separation queries."
+    )
+    parser.add_argument("queries", help="CSV or JSON Lines file of queries")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-o", "--output", help="output file (default stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("-c", "--neighbor-cache", type=int, metavar="PAIRS",
+                        help="cache the co-stars of the people expanded, "
+                             "up to PAIRS (movie, person) pairs per process")
+    args = parser.parse_args()
+
+    global graph
+    graph = Graph.from_directory(args.directory)
+    if args.neighbor_cache is not None:
+        graph.enable_neighbor_cache(args.neighbor_cache)
+
+    output = sys.stdout
+    if args.output is not None:
+        output = open(args.output, "w", encoding="utf-8")
+    try:
+        queries = read_queries(args.queries)
+        for result in answer_queries(queries, args.directory, args.workers,
+                                     args.neighbor_cache):
+            output.write(json.dumps(result) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def read_queries(filename):
+    """
+    Yields (source, target) pairs from a CSV or JSON Lines file.
+    """
+    with open(filename, encoding="utf-8") as f:
+        if filename.endswith((".jsonl", ".json")):
+            for line in f:
+                if line.strip():
+                    query = json.loads(line)
+                    yield str(query["source"]), str(query["target"])
+        else:
+            for row in csv.DictReader(f):
+                yield row["source"], row["target"]
+
+
+def resolve(person):
+    """
+    Returns (index, error) for a person given by IMDB id or by name.
+    """
+    index = graph.person_index(person)
+    if index is not None:
+        return index, None
+    matches = graph.people_named(person)
+    if len(matches) == 1:
+        return matches[0], None
+    if not matches:
+        return None, "person not found"
+    ids = ", ".join(graph.person_ids[i] for i in matches)
+    return None, f"ambiguous name, candidates: {ids}"
+
+
+def answer_queries(queries, directory, workers=1, neighbor_cache=None):
+    """
+    Yields one result dictionary per (source, target) query, in order.
+
+    Queries sharing a source are answered from a single breadth-first
+    search tree. Distinct sources are searched in `workers` processes,
+    each loading the graph snapshot of `directory` and, if
+    `neighbor_cache` is given, caching up to that many co-star pairs.
+    """
+    # Each result with the (source, target) indices it waits on
+    pending = []
+    targets_by_source = {}
+    for line, (source, target) in enumerate(queries, 1):
+        result = {"line": line, "source": source, "target": target}
+        source_index, error = resolve(source)
+        if error is None:
+            target_index, error = resolve(target)
+        if error is not None:
+            result["error"] = error
+            pending.append((result, None))
+            continue
+        result["source_id"] = graph.person_ids[source_index]
+        result["target_id"] = graph.person_ids[target_index]
+        pending.append((result, (source_index, target_index)))
+        targets_by_source.setdefault(source_index, []).append(target_index)
+
+    # Search sources in order of their first query so output can stream
+    tasks = list(targets_by_source.items())
+    if workers > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(
+            workers, initializer=init_worker,
+            initargs=(directory, neighbor_cache)
+        )
+        answers = pool.imap(search_source, tasks)
+    else:
+        pool = None
+        answers = map(search_source, tasks)
+
+    paths = {}
+    position = 0
+    try:
+        for (source, _), found in zip(tasks, answers):
+            for target, path in found.items():
+                paths[source, target] = path
+
+            # Emit every result in order up to the first still unanswered
+            while position < len(pending):
+                result, key = pending[position]
+                if key is not None and key not in paths:
+                    break
+                yield finish(result, paths.get(key))
+                pending[position] = None
+                position += 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    for result, key in pending[position:]:
+        yield finish(result, paths.get(key))
+
+
+def finish(result, path):
+    """
+    Fills in the degrees and path of a result from its (movie, person)
+    index `path`.
+    """
+    if "error" in result:
+        return result
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            [graph.movie_ids[movie], graph.person_ids[person]]
+            for movie, person in path
+        ]
+    return result
+
+
+def init_worker(directory, neighbor_cache=None):
+    global graph
+    graph = Graph.from_directory(directory)
+    if neighbor_cache is not None:
+        graph.enable_neighbor_cache(neighbor_cache)
+
+
+def search_source(task):
+    """
+    Searches from one source, returning a dictionary mapping each
+    of its targets to the (movie, person) index path, or None.
+    """
+    source, targets = task
+    parents = graph.search_tree(source, targets)
+    return {
+        target: trace_path(parents, target) if target in parents else None
+        for target in targets
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark for the name index of lookup.py.
+
+Generates a dataset of people with common first names and random
+surnames, builds its name index and times a set of name searches,
+exiting with status 1 if any takes longer than the budget.
+
+Usage: python benchmark.py [--people N] [--seed S] [--budget SECONDS]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+from graph import Graph
+from lookup import NameIndex
+
+FIRST_NAMES = ["Tom", "Mary", "Jose", "John", "Anna", "Peter", "Maria",
+               "James", "Linda", "Robert", "Sarah", "David"]
+
+# Prefixes, exact names, typos and names nobody has
+QUERIES = ["Tom Abcde", "Mary Smth", "Jose", "tom", "m", "Jo",
+           "Marai Qwertyu", "Zzz Zzz"]
+
+# Times each query is repeated, keeping the median
+REPEATS = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time name searches on a generated dataset."
+    )
+    parser.add_argument("--people", type=int, default=300000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=float, default=0.001,
+                        help="longest time a search may take, in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate(directory, args.people, args.seed)
+        graph = Graph.from_csv(directory)
+    index = NameIndex.build(graph)
+
+    timings = time_queries(graph, index, QUERIES)
+    for query, seconds in timings.items():
+        print(f"{query!r}: {seconds * 1e6:.0f}us")
+    if max(timings.values()) > args.budget:
+        sys.exit(f"slower than {args.budget * 1e6:.0f}us")
+
+
+def generate(directory, num_people, seed):
+    """
+    Writes people, movies and stars CSV files for `num_people` people,
+    each starring in 1 to 4 of `num_people` // 3 movies, to `directory`.
+    """
+    rng = random.Random(seed)
+    num_movies = max(1, num_people // 3)
+    with open(os.path.join(directory, "people.csv"), "w") as f:
+        f.write("id,name,birth\n")
+        for person in range(num_people):
+            surname = "".join(rng.choice(string.ascii_lowercase)
+                              for _ in range(rng.randint(3, 9)))
+            f.write(f"{person},{rng.choice(FIRST_NAMES)} "
+                    f"{surname.capitalize()},\n")
+    with open(os.path.join(directory, "movies.csv"), "w") as f:
+        f.write("id,title,year\n")
+        for movie in range(num_movies):
+            f.write(f"{movie},Movie {movie},\n")
+    with open(os.path.join(directory, "stars.csv"), "w") as f:
+        f.write("person_id,movie_id\n")
+        for person in range(num_people):
+            for _ in range(rng.randint(1, 4)):
+                f.write(f"{person},{rng.randrange(num_movies)}\n")
+
+
+def time_queries(graph, index, queries):
+    """
+    Returns the median time in seconds of REPEATS searches for each of
+    `queries`.
+    """
+    timings = {}
+    for query in queries:
+        seconds = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            index.search(graph, query)
+            seconds.append(time.perf_counter() - start)
+        timings[query] = statistics.median(seconds)
+    return timings
+
+
+if __name__ == "__main__":
+    main()
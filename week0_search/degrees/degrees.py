@@ -1,7 +1,11 @@
-import csv
+import math
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import Graph, join_paths
+from ingest import IngestReport, read_chunks
+from landmarks import LandmarkIndex
+from lookup import NameIndex
+from util import Node, NeighborCache, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,55 +16,166 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed graph, used instead of the dictionaries above
+# when data is loaded in compact mode
+graph = None
 
-def load_data(directory):
+# Landmark distance index over `graph`, if loaded
+landmark_index = None
+
+# Prefix and typo-tolerant index of the names in `graph`, if loaded
+name_index = None
+
+# Cache used by `neighbors_for_person`, if enabled
+neighbor_cache = None
+
+# Counts of the rows read by the last `load_data`
+ingest_report = None
+
+
+def load_data(directory, compact=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, builds an integer-indexed `Graph` instead of
+    the `names`, `people` and `movies` dictionaries, reusing or writing
+    a binary snapshot of it next to the CSV files.
+
+    Rows that could not be loaded are counted in `ingest_report`.
     """
+    global graph, landmark_index, name_index, ingest_report
+    names.clear()
+    people.clear()
+    movies.clear()
+    landmark_index = None
+    name_index = None
+    ingest_report = IngestReport()
+    if compact:
+        graph = Graph.from_directory(directory, ingest_report)
+        if neighbor_cache is not None:
+            enable_neighbor_cache(neighbor_cache.max_pairs)
+        return
+    graph = None
+    if neighbor_cache is not None:
+        enable_neighbor_cache(neighbor_cache.max_pairs)
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
+    people_report = ingest_report.file("people.csv")
+    for chunk in read_chunks(directory, "people.csv",
+                             ("id", "name", "birth"), ingest_report):
+        for person_id, name, birth in chunk:
+            if person_id in people:
+                people_report.duplicates += 1
+                continue
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            if name.lower() not in names:
+                names[name.lower()] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
+                names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
+    movies_report = ingest_report.file("movies.csv")
+    for chunk in read_chunks(directory, "movies.csv",
+                             ("id", "title", "year"), ingest_report):
+        for movie_id, title, year in chunk:
+            if movie_id in movies:
+                movies_report.duplicates += 1
+                continue
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
                 "stars": set()
             }
 
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    # Load stars, counting references to unknown people or movies
+    stars_report = ingest_report.file("stars.csv")
+    for chunk in read_chunks(directory, "stars.csv",
+                             ("person_id", "movie_id"), ingest_report):
+        for person_id, movie_id in chunk:
+            if person_id not in people or movie_id not in movies:
+                stars_report.dangling += 1
+                continue
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+
+
+def load_landmarks(directory, count=None):
+    """
+    Loads (building if needed) the landmark index saved next to the
+    data in `directory`, using `count` landmarks. Requires data loaded
+    in compact mode.
+    """
+    global landmark_index
+    if graph is None:
+        raise Exception("landmarks require data loaded in compact mode")
+    if count is None:
+        landmark_index = LandmarkIndex.from_directory(graph, directory)
+    else:
+        landmark_index = LandmarkIndex.from_directory(graph, directory, count)
+
+
+def load_name_index(directory):
+    """
+    Loads (building if needed) the name index saved next to the data
+    in `directory`. Requires data loaded in compact mode.
+    """
+    global name_index
+    if graph is None:
+        raise Exception("name index requires data loaded in compact mode")
+    name_index = NameIndex.from_directory(graph, directory)
+
+
+def enable_neighbor_cache(max_pairs=1000000):
+    """
+    Caches the neighbors of the most recently expanded people, keeping
+    at most `max_pairs` (movie, person) pairs in total: the cap is a
+    count of pairs, not of bytes.
+
+    With data loaded in compact mode, the cache holds the co-stars of
+    each person as index arrays and serves the breadth-first searches
+    of the graph (see `Graph.enable_neighbor_cache`); otherwise it holds the results
+    of `neighbors_for_person`. Returns the cache, whose `stats()`
+    reports hits, misses and evictions.
+    """
+    global neighbor_cache
+    if graph is not None:
+        neighbor_cache = graph.enable_neighbor_cache(max_pairs)
+    else:
+        neighbor_cache = NeighborCache(find_neighbors, max_pairs)
+    return neighbor_cache
+
+
+def disable_neighbor_cache():
+    global neighbor_cache
+    neighbor_cache = None
+    if graph is not None:
+        graph.neighbor_cache = None
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    options = [arg for arg in args if arg.startswith("--")]
+    args = [arg for arg in args if not arg.startswith("--")]
+    landmarks = "--landmarks" in options
+    compact = "--compact" in options or landmarks
+    report = "--report" in options
+    if len(args) > 1 or set(options) - {"--compact", "--landmarks", "--report"}:
+        sys.exit("Usage: python degrees.py "
+                 "[--compact] [--landmarks] [--report] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=compact)
+    if landmarks:
+        load_landmarks(directory)
     print("Data loaded.")
+    if report:
+        print(ingest_report)
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +184,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=landmark_index is None)
 
     if path is None:
         print("Not connected.")
@@ -78,19 +193,27 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_name(path[i][1])
+            person2 = person_name(path[i + 1][1])
+            movie = movie_title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is true, searches from both ends at once.
+    Otherwise, if a landmark index is loaded, runs an A* search
+    guided by it.
+
     If no possible path, returns None.
     """
+    if graph is not None:
+        return compact_shortest_path(source, target, bidirectional)
+    if bidirectional:
+        return bidirectional_search(source, target, neighbors_for_person)
 
     # TODO
     # To keep track of numer of stated explored
@@ -138,20 +261,109 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def compact_shortest_path(source, target, bidirectional=False):
+    """
+    Runs `shortest_path` on the compact graph, translating
+    IMDB ids to and from integer indices.
+    """
+    source_index = graph.person_index(source)
+    target_index = graph.person_index(target)
+    if source_index is None or target_index is None:
+        return None
+    if bidirectional:
+        path = graph.bidirectional_path(source_index, target_index)
+    elif landmark_index is not None:
+        path = landmark_index.shortest_path(graph, source_index, target_index)
+    else:
+        path = graph.shortest_path(source_index, target_index)
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def degree_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two IMDB person ids from the landmark index, both math.inf if the
+    two are not connected.
+    """
+    if landmark_index is None:
+        raise Exception("no landmark index loaded")
+    source_index = graph.person_index(source)
+    target_index = graph.person_index(target)
+    if source_index is None or target_index is None:
+        return math.inf, math.inf
+    return landmark_index.bounds(source_index, target_index)
+
+
+def bidirectional_search(source, target, neighbors):
+    """
+    Breadth-first search expanding alternately from `source` and `target`,
+    always growing the smaller frontier by one full layer.
+
+    `neighbors(state)` returns (action, state) pairs and must be symmetric.
+    Returns the list of (action, state) pairs from source to target,
+    or None if they are not connected.
+    """
+    if source == target:
+        return []
+
+    # Map each reached state to the (action, state) step linking it back
+    # towards the side that reached it
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            reached, other, frontier = forward, backward, forward_frontier
+        else:
+            reached, other, frontier = backward, forward, backward_frontier
+
+        # Expand one whole layer; the first contact is already optimal
+        next_frontier = []
+        meeting = None
+        for state in frontier:
+            for action, neighbor in neighbors(state):
+                if neighbor in reached:
+                    continue
+                reached[neighbor] = (action, state)
+                if neighbor in other:
+                    meeting = neighbor
+                    break
+                next_frontier.append(neighbor)
+            if meeting is not None:
+                break
+
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+        if reached is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = [graph.person_ids[i] for i in graph.people_named(name)]
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            name = person_name(person_id)
+            birth = person_birth(person_id)
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -164,11 +376,62 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_name(person_id):
+    """
+    Returns the name of the person with IMDB id `person_id`.
+    """
+    if graph is not None:
+        return graph.person_names[graph.person_index(person_id)]
+    return people[person_id]["name"]
+
+
+def person_birth(person_id):
+    """
+    Returns the birth year of the person with IMDB id `person_id`.
+    """
+    if graph is not None:
+        return graph.person_births[graph.person_index(person_id)]
+    return people[person_id]["birth"]
+
+
+def movie_title(movie_id):
+    """
+    Returns the title of the movie with IMDB id `movie_id`.
+    """
+    if graph is not None:
+        return graph.movie_titles[graph.movie_index(movie_id)]
+    return movies[movie_id]["title"]
+
+
+def find_people(name, limit=10):
+    """
+    Returns up to `limit` ranked candidates for a possibly partial or
+    misspelled name, without prompting. Each candidate is a dictionary
+    with the person's `id`, `name`, `birth`, number of `movies` and
+    match `score`. Requires a loaded name index.
+    """
+    if name_index is None:
+        raise Exception("no name index loaded")
+    return name_index.search(graph, name, limit)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if neighbor_cache is not None and graph is None:
+        return neighbor_cache.get(person_id)
+    return find_neighbors(person_id)
+
+
+def find_neighbors(person_id):
+    """
+    Computes the result of `neighbors_for_person`, bypassing the cache.
+    """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
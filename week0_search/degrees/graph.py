@@ -0,0 +1,728 @@
+"""
+Compact, integer-indexed representation of the degrees dataset.
+
+People and movies are interned to dense integers in file order, and the
+star relation is kept as two CSR-style adjacency lists:
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]
+        movies that person `p` starred in
+    movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+        people who starred in movie `m`
+
+String IMDB ids are only needed to translate input and output.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from ingest import IngestReport, read_chunks
+from util import NeighborCache
+
+# Typecode used for every integer buffer of the graph
+INT = "i"
+
+# Typecode of the offsets into the text of a string table
+OFFSET = "q"
+
+# Tables mapping an index to a string
+STRING_TABLES = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+)
+
+# Tables of integers
+INT_TABLES = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "name_order", "person_id_order", "movie_id_order",
+)
+
+TABLES = STRING_TABLES + INT_TABLES
+
+# Snapshot file written next to the CSV files
+SNAPSHOT_NAME = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 1
+
+# Magic, version, byte order mark, number of sections
+SNAPSHOT_HEADER = struct.Struct("<8sIIQ")
+
+# Section name, offset and size in bytes
+SNAPSHOT_SECTION = struct.Struct("<24sQQ")
+
+# Integer arrays are stored in native byte order, recorded as this mark
+BYTE_ORDER = {"little": 1, "big": 2}[sys.byteorder]
+
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+
+class Graph():
+
+    def __init__(self, **tables):
+        """
+        Takes one keyword argument per name in `TABLES`.
+
+        The string tables map an integer index to a string, the
+        `*_order` tables list indices sorted by id or lowercase name, and
+        the remaining tables are the CSR adjacency arrays.
+        """
+        for name in TABLES:
+            setattr(self, name, tables[name])
+        self._mmap = None
+        self._person_index = None
+        self._movie_index = None
+
+        # Cache of the co-stars of the people searches expand, if enabled
+        self.neighbor_cache = None
+
+    @classmethod
+    def from_csv(cls, directory, report=None):
+        """
+        Builds a graph from the people, movies and stars CSV files
+        in `directory`, reading each in chunks.
+
+        Rows that are malformed, repeat an id or refer to an unknown
+        person or movie are counted in `report`, an `IngestReport`.
+        """
+        if report is None:
+            report = IngestReport()
+
+        person_ids, person_names, person_births = [], [], []
+        person_index = {}
+        people_report = report.file("people.csv")
+        for chunk in read_chunks(directory, "people.csv",
+                                 ("id", "name", "birth"), report):
+            for person_id, name, birth in chunk:
+                if person_id in person_index:
+                    people_report.duplicates += 1
+                    continue
+                person_index[person_id] = len(person_ids)
+                person_ids.append(person_id)
+                person_names.append(name)
+                person_births.append(birth)
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        movie_index = {}
+        movies_report = report.file("movies.csv")
+        for chunk in read_chunks(directory, "movies.csv",
+                                 ("id", "title", "year"), report):
+            for movie_id, title, year in chunk:
+                if movie_id in movie_index:
+                    movies_report.duplicates += 1
+                    continue
+                movie_index[movie_id] = len(movie_ids)
+                movie_ids.append(movie_id)
+                movie_titles.append(title)
+                movie_years.append(year)
+
+        # Star rows as two parallel edge arrays
+        edge_people = array(INT)
+        edge_movies = array(INT)
+        stars_report = report.file("stars.csv")
+        for chunk in read_chunks(directory, "stars.csv",
+                                 ("person_id", "movie_id"), report):
+            for person_id, movie_id in chunk:
+                person = person_index.get(person_id)
+                movie = movie_index.get(movie_id)
+                if person is None or movie is None:
+                    stars_report.dangling += 1
+                    continue
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+        person_offsets, person_movies = build_csr(
+            len(person_ids), edge_people, edge_movies
+        )
+        stars_report.duplicates += len(edge_people) - len(person_movies)
+        del edge_people, edge_movies
+        movie_offsets, movie_stars = transpose_csr(
+            len(movie_ids), person_offsets, person_movies
+        )
+
+        graph = cls(
+            person_ids=person_ids,
+            person_names=person_names,
+            person_births=person_births,
+            movie_ids=movie_ids,
+            movie_titles=movie_titles,
+            movie_years=movie_years,
+            person_offsets=person_offsets,
+            person_movies=person_movies,
+            movie_offsets=movie_offsets,
+            movie_stars=movie_stars,
+            name_order=sort_indices(person_names, str.lower),
+            person_id_order=sort_indices(person_ids),
+            movie_id_order=sort_indices(movie_ids),
+        )
+        graph._person_index = person_index
+        graph._movie_index = movie_index
+        return graph
+
+    @classmethod
+    def from_directory(cls, directory, report=None):
+        """
+        Loads the graph for the CSV files in `directory`, using the
+        snapshot next to them if it is newer than all of them and
+        writing a fresh snapshot otherwise.
+
+        Ingestion of the CSV files is recorded in `report`.
+        """
+        path = os.path.join(directory, SNAPSHOT_NAME)
+        if snapshot_is_fresh(path, directory):
+            try:
+                graph = cls.load(path)
+                if report is not None:
+                    report.snapshot = True
+                return graph
+            except (OSError, ValueError):
+                pass
+
+        graph = cls.from_csv(directory, report)
+        try:
+            graph.save(path)
+        except OSError:
+            pass
+        return graph
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps the snapshot at `path`.
+
+        Tables are read straight from the mapped pages, so processes
+        loading the same snapshot share its memory.
+        Raises ValueError if the file is not a current snapshot.
+        """
+        mapped, sections = read_sections(path, SNAPSHOT_MAGIC, SNAPSHOT_VERSION)
+        tables = {}
+        try:
+            for name in STRING_TABLES:
+                tables[name] = StringTable.from_sections(sections, name)
+            for name in INT_TABLES:
+                tables[name] = sections[name].cast(INT)
+        except KeyError as e:
+            raise ValueError(f"snapshot has no section {e}")
+
+        graph = cls(**tables)
+        graph._mmap = mapped
+        return graph
+
+    def save(self, path):
+        """
+        Writes a snapshot of the graph to `path`.
+        """
+        sections = []
+        for name in STRING_TABLES:
+            sections.extend(StringTable.sections(name, getattr(self, name)))
+        for name in INT_TABLES:
+            sections.append((name, getattr(self, name)))
+        write_sections(path, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sections)
+
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def person_index(self, person_id):
+        """
+        Returns the integer index of IMDB person id `person_id`,
+        or None if there is no such person.
+        """
+        if self._person_index is not None:
+            return self._person_index.get(person_id)
+        matches = find_sorted(self.person_id_order, self.person_ids, person_id)
+        return matches[0] if matches else None
+
+    def movie_index(self, movie_id):
+        """
+        Returns the integer index of IMDB movie id `movie_id`,
+        or None if there is no such movie.
+        """
+        if self._movie_index is not None:
+            return self._movie_index.get(movie_id)
+        matches = find_sorted(self.movie_id_order, self.movie_ids, movie_id)
+        return matches[0] if matches else None
+
+    def people_named(self, name):
+        """
+        Returns the indices of all people whose name matches `name`,
+        ignoring case.
+        """
+        return find_sorted(self.name_order, self.person_names, name.lower(),
+                           key=str.lower)
+
+    def reach(self, person):
+        """
+        Returns the number of (movie, person) pairs `person` can be
+        reached through, a cheap upper bound on their number of co-stars.
+        """
+        total = 0
+        for movie in self.movies_of(person):
+            total += self.movie_offsets[movie + 1] - self.movie_offsets[movie]
+        return total
+
+    def movies_of(self, person):
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with `person`.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        pairs = []
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[k]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                pairs.append((movie, movie_stars[j]))
+        return pairs
+
+    def costars(self, person):
+        """
+        Returns (movies, people) index arrays listing each person who
+        starred with `person` once, with the first of their movies
+        together, in the order a breadth-first search reaches them.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        movies, people = array(INT), array(INT)
+        seen = {person}
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[k]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                star = movie_stars[j]
+                if star not in seen:
+                    seen.add(star)
+                    movies.append(movie)
+                    people.append(star)
+        return movies, people
+
+    def enable_neighbor_cache(self, max_pairs=1000000):
+        """
+        Makes the breadth-first searches expand people through an LRU
+        cache of their co-stars, holding at most `max_pairs` (movie,
+        person) pairs in total (a count of pairs, not bytes). Returns
+        the cache, whose `stats()` reports hits, misses and evictions.
+
+        Searches without the cache read the same arrays, but expand
+        each movie only once per search, so the cache only saves work
+        when people have far fewer co-stars than their movies have
+        cast members.
+        """
+        self.neighbor_cache = NeighborCache(
+            self.costars, max_pairs, size=lambda pairs: len(pairs[0])
+        )
+        return self.neighbor_cache
+
+    def shortest_path(self, source, target):
+        """
+        Breadth-first search from person `source` to person `target`.
+
+        Returns the list of (movie, person) index pairs leading to the
+        target, or None if the two are not connected.
+        """
+        parents = self.search_tree(source, {target})
+        if target not in parents:
+            return None
+        return trace_path(parents, target)
+
+    def search_tree(self, source, targets=None):
+        """
+        Breadth-first search from person `source`, returning a dictionary
+        mapping every person reached to the (movie, person) pair it was
+        reached from (None for the source).
+
+        If `targets` is given, stops once all of those people are reached.
+        """
+        parents = {source: None}
+        remaining = None
+        if targets is not None:
+            remaining = set(targets)
+            remaining.discard(source)
+            if not remaining:
+                return parents
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        cache = self.neighbor_cache
+
+        # Each movie only needs expanding once, by the first person reaching it
+        seen_movies = set()
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for person in frontier:
+                if cache is not None:
+                    for movie, star in zip(*cache.get(person)):
+                        if star in parents:
+                            continue
+                        parents[star] = (movie, person)
+                        if remaining is not None and star in remaining:
+                            remaining.remove(star)
+                            if not remaining:
+                                return parents
+                        next_frontier.append(star)
+                    continue
+                for k in range(person_offsets[person],
+                               person_offsets[person + 1]):
+                    movie = person_movies[k]
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for j in range(movie_offsets[movie],
+                                   movie_offsets[movie + 1]):
+                        star = movie_stars[j]
+                        if star in parents:
+                            continue
+                        parents[star] = (movie, person)
+                        if remaining is not None and star in remaining:
+                            remaining.remove(star)
+                            if not remaining:
+                                return parents
+                        next_frontier.append(star)
+            frontier = next_frontier
+        return parents
+
+    def distances(self, source, unreachable=-1):
+        """
+        Returns an array holding the number of degrees between `source`
+        and every person, or `unreachable` for people not connected to it.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        distance = array(INT, [unreachable]) * self.num_people()
+        distance[source] = 0
+        seen_movies = bytearray(self.num_movies())
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for person in frontier:
+                for k in range(person_offsets[person],
+                               person_offsets[person + 1]):
+                    movie = person_movies[k]
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for j in range(movie_offsets[movie],
+                                   movie_offsets[movie + 1]):
+                        star = movie_stars[j]
+                        if distance[star] == unreachable:
+                            distance[star] = depth
+                            next_frontier.append(star)
+            frontier = next_frontier
+        return distance
+
+    def bidirectional_path(self, source, target):
+        """
+        Like `shortest_path`, but expands alternately from both ends,
+        always growing the smaller frontier by one full layer.
+        """
+        if source == target:
+            return []
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        cache = self.neighbor_cache
+
+        forward, backward = {source: None}, {target: None}
+        forward_movies, backward_movies = set(), set()
+        forward_frontier, backward_frontier = [source], [target]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                reached, other, seen_movies, frontier = (
+                    forward, backward, forward_movies, forward_frontier
+                )
+            else:
+                reached, other, seen_movies, frontier = (
+                    backward, forward, backward_movies, backward_frontier
+                )
+
+            next_frontier = []
+            for person in frontier:
+                if cache is not None:
+                    for movie, star in zip(*cache.get(person)):
+                        if star in reached:
+                            continue
+                        reached[star] = (movie, person)
+                        if star in other:
+                            return join_paths(star, forward, backward)
+                        next_frontier.append(star)
+                    continue
+                for k in range(person_offsets[person],
+                               person_offsets[person + 1]):
+                    movie = person_movies[k]
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for j in range(movie_offsets[movie],
+                                   movie_offsets[movie + 1]):
+                        star = movie_stars[j]
+                        if star in reached:
+                            continue
+                        reached[star] = (movie, person)
+                        if star in other:
+                            return join_paths(star, forward, backward)
+                        next_frontier.append(star)
+
+            if reached is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        return None
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as UTF-8 text and the
+    offsets at which each string starts.
+    """
+
+    def __init__(self, offsets, text):
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_sections(cls, sections, name):
+        """
+        Returns the table saved as section `name` of a snapshot.
+        """
+        return cls(sections[f"{name}.offsets"].cast(OFFSET),
+                   sections[f"{name}.text"])
+
+    @staticmethod
+    def sections(name, values):
+        """
+        Returns the (name, data) snapshot sections storing `values`
+        as a string table.
+        """
+        offsets = array(OFFSET, [0])
+        text = bytearray()
+        for value in values:
+            text += value.encode("utf-8")
+            offsets.append(len(text))
+        return [(f"{name}.offsets", offsets), (f"{name}.text", text)]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.text[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def read_sections(path, magic, version):
+    """
+    Memory-maps the sectioned file at `path`, returning the mapping and
+    a dictionary of memoryviews of its sections by name.
+    Raises ValueError if the file does not have the given magic and
+    version or was written with another byte order.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    try:
+        found_magic, found_version, mark, count = (
+            SNAPSHOT_HEADER.unpack_from(view)
+        )
+    except struct.error:
+        raise ValueError("truncated snapshot")
+    if found_magic != magic or found_version != version:
+        raise ValueError(f"not a current {magic.rstrip(bytes(1)).decode()} file")
+    if mark != BYTE_ORDER:
+        raise ValueError("snapshot written with another byte order")
+
+    sections = {}
+    position = SNAPSHOT_HEADER.size
+    for _ in range(count):
+        try:
+            name, offset, size = SNAPSHOT_SECTION.unpack_from(view, position)
+        except struct.error:
+            raise ValueError("truncated snapshot")
+        position += SNAPSHOT_SECTION.size
+        if offset + size > len(view):
+            raise ValueError("truncated snapshot")
+        sections[name.rstrip(b"\0").decode()] = view[offset:offset + size]
+    return mapped, sections
+
+
+def write_sections(path, magic, version, sections):
+    """
+    Writes the (name, data) `sections` to `path` in the format read
+    by `read_sections`, replacing the file atomically.
+    """
+    # Sections start on 8-byte boundaries after the header and table
+    position = SNAPSHOT_HEADER.size + SNAPSHOT_SECTION.size * len(sections)
+    layout = []
+    for name, data in sections:
+        position += -position % 8
+        size = memoryview(data).nbytes
+        layout.append((name, position, size))
+        position += size
+
+    # Write to a temporary file so readers never see a partial file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(
+                magic, version, BYTE_ORDER, len(sections)
+            ))
+            for name, offset, size in layout:
+                f.write(SNAPSHOT_SECTION.pack(name.encode(), offset, size))
+            for (name, data), (_, offset, _) in zip(sections, layout):
+                f.write(bytes(offset - f.tell()))
+                f.write(memoryview(data))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def snapshot_is_fresh(path, directory):
+    """
+    Returns True if the snapshot at `path` exists and is newer
+    than every CSV file in `directory`.
+    """
+    try:
+        written = os.stat(path).st_mtime
+    except OSError:
+        return False
+    for name in CSV_FILES:
+        try:
+            if os.stat(os.path.join(directory, name)).st_mtime > written:
+                return False
+        except OSError:
+            pass
+    return True
+
+
+def is_newer(path, other):
+    """
+    Returns True if the file at `path` exists and was modified after
+    the file at `other`.
+    """
+    try:
+        return os.stat(path).st_mtime > os.stat(other).st_mtime
+    except OSError:
+        return False
+
+
+def sort_indices(values, key=None):
+    """
+    Returns an array of the indices of `values` in sorted order.
+    """
+    if key is None:
+        return array(INT, sorted(range(len(values)), key=values.__getitem__))
+    return array(INT, sorted(range(len(values)),
+                             key=lambda i: key(values[i])))
+
+
+def find_sorted(order, values, value, key=None):
+    """
+    Returns the indices `i` whose `values[i]` equals `value` (after
+    applying `key`), where `order` lists indices sorted the same way.
+    """
+    if key is None:
+        def lookup(i):
+            return values[i]
+    else:
+        def lookup(i):
+            return key(values[i])
+    start = bisect_left(order, value, key=lookup)
+    matches = []
+    for position in range(start, len(order)):
+        if lookup(order[position]) != value:
+            break
+        matches.append(order[position])
+    return matches
+
+
+def build_csr(size, rows, columns):
+    """
+    Groups the (rows[i], columns[i]) edges by row into CSR offsets and
+    values over `size` rows, dropping duplicate edges.
+    """
+    counts = array(INT, bytes(array(INT).itemsize * (size + 1)))
+    for row in rows:
+        counts[row + 1] += 1
+    for i in range(size):
+        counts[i + 1] += counts[i]
+
+    values = array(INT, bytes(array(INT).itemsize * len(columns)))
+    cursor = array(INT, counts)
+    for row, column in zip(rows, columns):
+        values[cursor[row]] = column
+        cursor[row] += 1
+
+    # Sort each row and drop repeated entries
+    offsets = array(INT, [0])
+    unique = array(INT)
+    for row in range(size):
+        segment = sorted(set(values[counts[row]:counts[row + 1]]))
+        unique.extend(segment)
+        offsets.append(len(unique))
+    return offsets, unique
+
+
+def transpose_csr(size, offsets, values):
+    """
+    Returns the CSR offsets and values of the transpose of the
+    (`offsets`, `values`) adjacency, which has `size` rows.
+    """
+    rows = array(INT)
+    for row in range(len(offsets) - 1):
+        rows.extend([row] * (offsets[row + 1] - offsets[row]))
+    return build_csr(size, values, rows)
+
+
+def trace_path(parents, state):
+    """
+    Follows `parents` back from `state`, returning the
+    (action, state) pairs in forward order.
+    """
+    path = []
+    while parents[state] is not None:
+        action, parent = parents[state]
+        path.append((action, state))
+        state = parent
+    path.reverse()
+    return path
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the (action, state) path through `meeting` from the parent
+    maps of a bidirectional search.
+    """
+    path = trace_path(forward, meeting)
+    state = meeting
+    while backward[state] is not None:
+        action, child = backward[state]
+        path.append((action, child))
+        state = child
+    return path
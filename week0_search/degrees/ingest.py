@@ -0,0 +1,117 @@
+"""
+Streaming ingestion of the degrees CSV files.
+
+Rows are read in chunks of plain tuples rather than one dictionary per
+row, and every row that cannot be used is counted in an `IngestReport`
+instead of being dropped silently.
+"""
+
+import csv
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Number of rows handed to the caller at a time
+CHUNK_SIZE = 10000
+
+
+class FileReport():
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.malformed = 0
+        self.duplicates = 0
+        self.dangling = 0
+        self.seconds = 0.0
+
+    def rejected(self):
+        """Returns the number of rows that were not loaded."""
+        return self.malformed + self.duplicates + self.dangling
+
+    def rows_per_second(self):
+        if self.seconds == 0:
+            return 0.0
+        return self.rows / self.seconds
+
+    def __str__(self):
+        return (f"{self.name}: {self.rows} rows "
+                f"({self.rows_per_second():,.0f} rows/s), "
+                f"{self.rejected()} rejected "
+                f"({self.malformed} malformed, {self.duplicates} duplicate, "
+                f"{self.dangling} dangling)")
+
+
+class IngestReport():
+
+    def __init__(self):
+        self.files = {}
+        self.snapshot = False
+
+    def file(self, name):
+        """Returns the report for file `name`, creating it if needed."""
+        if name not in self.files:
+            self.files[name] = FileReport(name)
+        return self.files[name]
+
+    def __str__(self):
+        lines = [str(report) for report in self.files.values()]
+        if self.snapshot:
+            lines.append("Loaded from snapshot.")
+        rss = peak_rss()
+        if rss is not None:
+            lines.append(f"Peak RSS: {rss / 2 ** 20:.1f} MiB")
+        return "\n".join(lines)
+
+
+def read_chunks(directory, name, columns, report, chunk_size=CHUNK_SIZE):
+    """
+    Yields lists of at most `chunk_size` tuples holding the `columns`
+    values of each row of CSV file `name` in `directory`.
+
+    Blank lines are ignored, as by csv.DictReader, and rows with a
+    missing value are counted as malformed and skipped.
+    The time until the last chunk is consumed is added to the report.
+    """
+    file_report = report.file(name)
+    start = time.perf_counter()
+    with open(f"{directory}/{name}", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            positions = [header.index(column) for column in columns]
+        except ValueError:
+            raise ValueError(f"{name} must have columns {', '.join(columns)}")
+        width = max(positions) + 1
+
+        chunk = []
+        for row in reader:
+            if not row:
+                continue
+            file_report.rows += 1
+            if len(row) < width:
+                file_report.malformed += 1
+                continue
+            chunk.append(tuple(row[i] for i in positions))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    file_report.seconds += time.perf_counter() - start
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes,
+    or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
@@ -0,0 +1,242 @@
+"""
+Landmark (ALT) distance index over the compact degrees graph.
+
+Stores the number of degrees between a few well-connected landmark
+people and everybody else. By the triangle inequality, for any landmark
+`l` the distance between `s` and `t` is at least |d(l, s) - d(l, t)| and
+at most d(l, s) + d(l, t), which bounds degrees of separation in O(k)
+for k landmarks and gives an admissible heuristic for A* search.
+"""
+
+import heapq
+import math
+import mmap
+import os
+import struct
+from array import array
+
+from graph import INT, SNAPSHOT_NAME, is_newer, snapshot_is_fresh, trace_path
+
+# Index file written next to the CSV files
+INDEX_NAME = "degrees.landmarks"
+INDEX_MAGIC = b"LANDMARK"
+INDEX_VERSION = 1
+
+# Magic, version, number of landmarks, number of people
+INDEX_HEADER = struct.Struct("<8sIIQ")
+
+# Distances are stored in one byte each
+UNREACHABLE = 255
+
+DEFAULT_COUNT = 16
+
+
+class LandmarkIndex():
+
+    def __init__(self, landmarks, distances):
+        """
+        `landmarks` lists the landmark person indices and `distances`
+        holds, for each person `p` and landmark number `l`, the degrees
+        between them at `distances[p * len(landmarks) + l]`.
+        """
+        self.landmarks = landmarks
+        self.distances = distances
+        self.count = len(landmarks)
+        self._mmap = None
+
+    @classmethod
+    def build(cls, graph, landmarks):
+        """
+        Runs a breadth-first search from each of the `landmarks`.
+        """
+        count = len(landmarks)
+        distances = bytearray(graph.num_people() * count)
+        for l, landmark in enumerate(landmarks):
+            # UNREACHABLE itself is no valid distance
+            distance = graph.distances(landmark, unreachable=-1)
+            if max(distance) >= UNREACHABLE:
+                raise ValueError("distances too large to index")
+            distances[l::count] = bytes(
+                UNREACHABLE if d < 0 else d for d in distance
+            )
+        return cls(array(INT, landmarks), distances)
+
+    @classmethod
+    def from_directory(cls, graph, directory, count=DEFAULT_COUNT,
+                       landmarks=None):
+        """
+        Loads the index of `graph` saved in `directory`, building and
+        saving it if it is missing, older than the data or built for
+        other landmarks.
+
+        Uses the given `landmarks` person indices, or else the `count`
+        best connected people. A saved index of `count` landmarks is
+        trusted to hold the best connected people, which are only
+        chosen again when rebuilding.
+        """
+        path = os.path.join(directory, INDEX_NAME)
+        snapshot = os.path.join(directory, SNAPSHOT_NAME)
+        if (snapshot_is_fresh(path, directory)
+                and not is_newer(snapshot, path)):
+            try:
+                index = cls.load(path)
+                if landmarks is None:
+                    matches = index.count == min(count, graph.num_people())
+                else:
+                    matches = list(index.landmarks) == list(landmarks)
+                if (matches and len(index.distances)
+                        == graph.num_people() * index.count):
+                    return index
+            except (OSError, ValueError):
+                pass
+
+        if landmarks is None:
+            landmarks = choose_landmarks(graph, count)
+        index = cls.build(graph, landmarks)
+        try:
+            index.save(path)
+        except OSError:
+            pass
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps the index at `path`.
+        Raises ValueError if the file is not a current index.
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            magic, version, count, people = INDEX_HEADER.unpack_from(view)
+        except struct.error:
+            raise ValueError("truncated landmark index")
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("not a current landmark index")
+
+        start = INDEX_HEADER.size
+        end = start + count * array(INT).itemsize
+        if end + people * count != len(view):
+            raise ValueError("truncated landmark index")
+        index = cls(view[start:end].cast(INT), view[end:])
+        index._mmap = mapped
+        return index
+
+    def save(self, path):
+        """
+        Writes the index to `path`.
+        """
+        people = len(self.distances) // self.count if self.count else 0
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(INDEX_HEADER.pack(
+                    INDEX_MAGIC, INDEX_VERSION, self.count, people
+                ))
+                f.write(memoryview(array(INT, self.landmarks)))
+                f.write(memoryview(self.distances))
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees between people
+        `source` and `target`, both math.inf if they are not connected.
+        """
+        if source == target:
+            return 0, 0
+        count, distances = self.count, self.distances
+        lower, upper = 1, math.inf
+        s, t = source * count, target * count
+        for l in range(count):
+            a, b = distances[s + l], distances[t + l]
+            if a == UNREACHABLE or b == UNREACHABLE:
+                if a != b:
+                    return math.inf, math.inf
+                continue
+            lower = max(lower, abs(a - b))
+            upper = min(upper, a + b)
+        return lower, upper
+
+    def shortest_path(self, graph, source, target):
+        """
+        A* search from person `source` to person `target` in `graph`,
+        guided by the landmark lower bounds.
+
+        Returns the list of (movie, person) index pairs leading to the
+        target, or None if the two are not connected.
+        """
+        lower, best = self.bounds(source, target)
+        if lower == math.inf:
+            return None
+        if source == target:
+            return []
+
+        count, distances = self.count, self.distances
+        goal = [distances[target * count + l] for l in range(count)]
+
+        def estimate(person):
+            """Lower bound on the degrees from `person` to the target."""
+            row = person * count
+            h = 0
+            for l in range(count):
+                a, b = distances[row + l], goal[l]
+                if a == UNREACHABLE or b == UNREACHABLE:
+                    if a != b:
+                        return math.inf
+                    continue
+                if abs(a - b) > h:
+                    h = abs(a - b)
+            return h
+
+        person_offsets, person_movies = graph.person_offsets, graph.person_movies
+        movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+
+        # Cost of the best known path to each person, and to the people
+        # of each movie; a movie is only expanded again from a closer person
+        cost = {source: 0}
+        movie_cost = {}
+        parents = {source: None}
+        frontier = [(lower, 0, source)]
+        while frontier:
+            f, g, person = heapq.heappop(frontier)
+            g = -g
+            if person == target:
+                return trace_path(parents, target)
+            if g > cost[person]:
+                continue
+
+            for k in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[k]
+                if movie_cost.get(movie, math.inf) <= g:
+                    continue
+                movie_cost[movie] = g
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    star = movie_stars[j]
+                    if cost.get(star, math.inf) <= g + 1:
+                        continue
+
+                    # Prune people who cannot beat the best path known
+                    f = g + 1 + estimate(star)
+                    if f > best:
+                        continue
+                    if star == target:
+                        best = g + 1
+                    cost[star] = g + 1
+                    parents[star] = (movie, person)
+                    heapq.heappush(frontier, (f, -(g + 1), star))
+        return None
+
+
+def choose_landmarks(graph, count=DEFAULT_COUNT):
+    """
+    Returns the indices of the `count` people with the most co-star links.
+    """
+    return heapq.nlargest(
+        min(count, graph.num_people()), range(graph.num_people()),
+        key=graph.reach
+    )
+
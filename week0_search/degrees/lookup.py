@@ -0,0 +1,348 @@
+"""
+Prefix and typo-tolerant search over the names of the degrees graph.
+
+Names are normalized (lowercase, accents removed, spaces collapsed) and
+indexed twice: as a sorted list, for prefix search by bisection, and as
+an inverted index from each trigram of a name to the people whose name
+contains it, for approximate search. A name within `max_edits` edits of
+the query shares all but at most 3 * `max_edits` of its trigrams. The
+people listed under the query's rarer trigrams are counted, and those
+listed most often are scored after looking for the query's commonest
+trigrams in their names, so that no long list is ever scanned.
+
+Short prefixes match too many names to rank at query time, so the index
+also stores the people with the most movies for every prefix of up to
+POPULAR_PREFIX_LENGTH characters shared by more than POPULAR_THRESHOLD
+names.
+"""
+
+import heapq
+import os
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from operator import itemgetter
+
+from graph import (INT, SNAPSHOT_NAME, StringTable, is_newer, read_sections,
+                   snapshot_is_fresh, sort_indices, write_sections)
+
+# Index file written next to the CSV files
+INDEX_NAME = "degrees.names"
+INDEX_MAGIC = b"DEGNAMES"
+INDEX_VERSION = 2
+
+DEFAULT_LIMIT = 10
+DEFAULT_MAX_EDITS = 2
+
+# People scored at most by a similarity search
+MAX_CANDIDATES = 50
+
+# Trigrams listing more people than this, such as the first letters of
+# common first names, are not searched: they are only looked for in the
+# names of candidates found under rarer trigrams
+MAX_LIST_SIZE = 2000
+
+# Prefixes of up to POPULAR_PREFIX_LENGTH characters shared by more than
+# POPULAR_THRESHOLD names store their POPULAR_SIZE people with most movies
+POPULAR_PREFIX_LENGTH = 6
+POPULAR_THRESHOLD = 1024
+POPULAR_SIZE = 64
+
+
+class NameIndex():
+
+    def __init__(self, names, order, trigrams, offsets, postings, sizes,
+                 popular_prefixes, popular_offsets, popular_people):
+        """
+        `names` holds each person's normalized name and `order` lists
+        person indices sorted by it. The people whose name contains
+        `trigrams[i]` are `postings[offsets[i]:offsets[i + 1]]`, in
+        index order, with `trigrams` sorted, and `sizes` holds the
+        number of trigrams of each name.
+
+        The people with most movies whose name starts with
+        `popular_prefixes[i]` are
+        `popular_people[popular_offsets[i]:popular_offsets[i + 1]]`,
+        most first, with `popular_prefixes` sorted.
+        """
+        self.names = names
+        self.order = order
+        self.trigrams = trigrams
+        self.trigram_positions = {trigram: i
+                                  for i, trigram in enumerate(trigrams)}
+        self.offsets = offsets
+        self.postings = postings
+        self.sizes = sizes
+        self.popular_prefixes = popular_prefixes
+        self.popular_offsets = popular_offsets
+        self.popular_people = popular_people
+        self._mmap = None
+
+    @classmethod
+    def build(cls, graph):
+        names = [normalize(name) for name in graph.person_names]
+        people_by_trigram = {}
+        sizes = array(INT)
+        for person, name in enumerate(names):
+            name_trigrams = trigrams_of(name)
+            sizes.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                people_by_trigram.setdefault(trigram, array(INT)).append(person)
+
+        trigrams = sorted(people_by_trigram)
+        offsets = array(INT, [0])
+        postings = array(INT)
+        for trigram in trigrams:
+            postings.extend(people_by_trigram[trigram])
+            offsets.append(len(postings))
+
+        # Group the sorted names by each short prefix, keeping the most
+        # popular people of the large groups
+        order = sort_indices(names)
+        popular = []
+        for length in range(1, POPULAR_PREFIX_LENGTH + 1):
+            group, prefix = [], None
+            for person in order:
+                name = names[person]
+                if len(name) < length:
+                    continue
+                if name[:length] != prefix:
+                    if len(group) > POPULAR_THRESHOLD:
+                        popular.append((prefix, most_movies(graph, group)))
+                    group, prefix = [], name[:length]
+                group.append(person)
+            if len(group) > POPULAR_THRESHOLD:
+                popular.append((prefix, most_movies(graph, group)))
+        popular.sort()
+
+        popular_offsets = array(INT, [0])
+        popular_people = array(INT)
+        for _, people in popular:
+            popular_people.extend(people)
+            popular_offsets.append(len(popular_people))
+        return cls(names, order, trigrams, offsets, postings, sizes,
+                   [prefix for prefix, _ in popular], popular_offsets,
+                   popular_people)
+
+    @classmethod
+    def from_directory(cls, graph, directory):
+        """
+        Loads the index of `graph` saved in `directory`, building and
+        saving it if it is missing or older than the data.
+        """
+        path = os.path.join(directory, INDEX_NAME)
+        snapshot = os.path.join(directory, SNAPSHOT_NAME)
+        if (snapshot_is_fresh(path, directory)
+                and not is_newer(snapshot, path)):
+            try:
+                index = cls.load(path)
+                if len(index.names) == graph.num_people():
+                    return index
+            except (OSError, ValueError):
+                pass
+
+        index = cls.build(graph)
+        try:
+            index.save(path)
+        except OSError:
+            pass
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps the index at `path`.
+        Raises ValueError if the file is not a current index.
+        """
+        mapped, sections = read_sections(path, INDEX_MAGIC, INDEX_VERSION)
+        try:
+            index = cls(
+                StringTable.from_sections(sections, "names"),
+                sections["order"].cast(INT),
+                StringTable.from_sections(sections, "trigrams"),
+                sections["offsets"].cast(INT),
+                sections["postings"].cast(INT),
+                sections["sizes"].cast(INT),
+                StringTable.from_sections(sections, "popular_prefixes"),
+                sections["popular_offsets"].cast(INT),
+                sections["popular_people"].cast(INT),
+            )
+        except KeyError as e:
+            raise ValueError(f"name index has no section {e}")
+        index._mmap = mapped
+        return index
+
+    def save(self, path):
+        """
+        Writes the index to `path`.
+        """
+        sections = (StringTable.sections("names", self.names)
+                    + StringTable.sections("trigrams", self.trigrams)
+                    + StringTable.sections("popular_prefixes",
+                                           self.popular_prefixes)
+                    + [("order", self.order),
+                       ("offsets", self.offsets),
+                       ("postings", self.postings),
+                       ("sizes", self.sizes),
+                       ("popular_offsets", self.popular_offsets),
+                       ("popular_people", self.popular_people)])
+        write_sections(path, INDEX_MAGIC, INDEX_VERSION, sections)
+
+    def prefix(self, query, limit=None):
+        """
+        Returns the indices of people whose normalized name starts with
+        `query`, in name order.
+        """
+        start, end = self.prefix_range(normalize(query))
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self.order[position] for position in range(start, end)]
+
+    def prefix_range(self, query):
+        """
+        Returns the (start, end) positions in `order` of the names
+        starting with the normalized `query`.
+        """
+        names, order = self.names, self.order
+        start = bisect_left(order, query, key=names.__getitem__)
+        end = bisect_left(order, query + chr(sys.maxunicode),
+                          lo=start, key=names.__getitem__)
+        return start, end
+
+    def exact(self, query):
+        """
+        Returns the indices of people whose normalized name is `query`.
+        """
+        query = normalize(query)
+        start, end = self.prefix_range(query)
+        matches = []
+        for position in range(start, end):
+            if self.names[self.order[position]] != query:
+                break
+            matches.append(self.order[position])
+        return matches
+
+    def popular(self, graph, query, limit=DEFAULT_LIMIT):
+        """
+        Returns the indices of up to `limit` people whose normalized
+        name starts with `query`, most movies first.
+        """
+        query = normalize(query)
+        if limit <= POPULAR_SIZE:
+            i = bisect_left(self.popular_prefixes, query)
+            if (i < len(self.popular_prefixes)
+                    and self.popular_prefixes[i] == query):
+                start = self.popular_offsets[i]
+                end = min(self.popular_offsets[i + 1], start + limit)
+                return list(self.popular_people[start:end])
+
+        start, end = self.prefix_range(query)
+        return most_movies(graph, (self.order[position]
+                                   for position in range(start, end)), limit)
+
+    def similar(self, query, max_edits=DEFAULT_MAX_EDITS):
+        """
+        Returns a dictionary mapping people whose normalized name may be
+        within `max_edits` typing errors of `query`, and at most one per
+        four characters, to the Dice similarity of their trigrams with
+        the query's.
+
+        Trigrams listing more than MAX_LIST_SIZE people are only looked
+        for in the names of people found under the others, and only the
+        MAX_CANDIDATES people found under the most of those are scored.
+        """
+        query = normalize(query)
+        query_trigrams = trigrams_of(query)
+        if not query_trigrams:
+            return {}
+        max_edits = min(max_edits, len(query) // 4)
+        needed = max(1, len(query_trigrams) - 3 * max_edits)
+
+        # Count the people listed under each trigram rare enough to
+        # search, setting the others aside
+        candidates = Counter()
+        common_trigrams = []
+        for trigram in query_trigrams:
+            i = self.trigram_positions.get(trigram)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            if end - start > MAX_LIST_SIZE:
+                common_trigrams.append(trigram)
+            else:
+                candidates.update(self.postings[start:end])
+
+        total, sizes = len(query_trigrams), self.sizes
+        similarities = {}
+        ranked = sorted(candidates.items(), key=itemgetter(1), reverse=True)
+        for person, common in ranked[:MAX_CANDIDATES]:
+            if common + len(common_trigrams) < needed:
+                break
+            if common_trigrams:
+                padded = f"  {self.names[person]} "
+                common += sum(trigram in padded for trigram in common_trigrams)
+            if common >= needed:
+                similarities[person] = 2 * common / (total + sizes[person])
+        return similarities
+
+    def search(self, graph, query, limit=DEFAULT_LIMIT,
+               max_edits=DEFAULT_MAX_EDITS):
+        """
+        Returns up to `limit` candidates for `query`, best first: exact
+        matches, then names starting with the query, then similar names,
+        with ties broken by number of movies.
+
+        Each candidate is a dictionary with the person's IMDB `id`,
+        `name`, `birth`, number of `movies` and match `score`.
+        """
+        query = normalize(query)
+        scores = self.similar(query, max_edits)
+        for person in self.popular(graph, query, limit):
+            scores[person] = max(scores.get(person, 0), 1.0)
+        for person in self.exact(query):
+            scores[person] = 2.0
+
+        ranked = heapq.nsmallest(limit, scores, key=lambda person: (
+            -scores[person], -movie_count(graph, person), person
+        ))
+        return [{
+            "id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": movie_count(graph, person),
+            "score": round(scores[person], 3),
+        } for person in ranked]
+
+
+def movie_count(graph, person):
+    return graph.person_offsets[person + 1] - graph.person_offsets[person]
+
+
+def most_movies(graph, people, limit=POPULAR_SIZE):
+    """
+    Returns up to `limit` of `people` with the most movies, most first.
+    """
+    return heapq.nsmallest(limit, people, key=lambda person: (
+        -movie_count(graph, person), person
+    ))
+
+
+def normalize(name):
+    """
+    Lowercases `name`, strips accents and collapses whitespace.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def trigrams_of(name):
+    """
+    Returns the set of trigrams of a normalized name, padded so that
+    its first and last letters are in as many trigrams as the others.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
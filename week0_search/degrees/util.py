@@ -1,3 +1,6 @@
+from collections import OrderedDict, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,13 +10,17 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # Counts how many nodes in the frontier hold each state, so that
+        # membership checks do not have to scan the whole frontier
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,10 +29,17 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self._forget(node)
             return node
 
+    def _forget(self, node):
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+
 
 class QueueFrontier(StackFrontier):
 
@@ -33,6 +47,63 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self._forget(node)
             return node
+
+
+class NeighborCache():
+    """
+    Least-recently-used cache of the neighbors of each state.
+
+    Holds at most `max_pairs` neighbors in total across all states,
+    evicting the least recently used states first. The cap counts
+    (action, state) pairs, as measured by `size`, not bytes.
+    """
+
+    def __init__(self, neighbors, max_pairs=1000000, size=len):
+        self.neighbors = neighbors
+        self.max_pairs = max_pairs
+        self.measure = size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, state):
+        """
+        Returns the neighbors of `state`, which callers must not modify.
+        """
+        value = self.entries.get(state)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(state)
+            return value
+
+        self.misses += 1
+        value = self.neighbors(state)
+        size = self.measure(value)
+        if size <= self.max_pairs:
+            self.entries[state] = value
+            self.size += size
+            while self.size > self.max_pairs:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= self.measure(evicted)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        """Returns the cache counters as a dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "pairs": self.size,
+            "max_pairs": self.max_pairs,
+        }
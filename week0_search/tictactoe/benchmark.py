@@ -0,0 +1,301 @@
+"""
+Self-play benchmark for the tic-tac-toe search engines.
+
+Plays every engine against itself and against a random player from a
+fixed, seeded set of openings, recording for each engine move the wall
+time, positions searched, cache hits and peak memory allocated. Writes
+a JSON report (and optionally the moves as CSV), and can compare the
+summary against a stored baseline, exiting with status 1 on regression.
+
+Engines are the names in ENGINES or any "module.function" taking a
+board and returning an action.
+
+Usage: python benchmark.py [--engines NAME ...] [--games N] [--seed S]
+                           [--output FILE] [--csv FILE]
+                           [--baseline FILE] [--save-baseline FILE]
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import bitboard
+import mnk
+import tictactoe as ttt
+
+# Summary metrics compared against a baseline, where lower is better
+REGRESSION_METRICS = ["mean_seconds", "mean_nodes"]
+
+
+def search_without_book(board):
+    """
+    Runs the tictactoe search, ignoring the opening book.
+    """
+    book = ttt.opening_book
+    ttt.opening_book = None
+    try:
+        return ttt.minimax(board)
+    finally:
+        ttt.opening_book = book
+
+
+def reset_tictactoe():
+    ttt.transposition_table.clear()
+    ttt.killers.clear()
+    ttt.history.clear()
+
+
+def tictactoe_stats():
+    return {"nodes": ttt.nodes_visited, "cache_hits": ttt.table_hits}
+
+
+mnk_game = mnk.Game(3, 3, 3)
+
+
+def reset_mnk():
+    mnk_game.table.clear()
+
+
+# Maps engine names to (move, stats, reset) functions: `move` returns the
+# engine's action for a board, `stats` the counters of its last move and
+# `reset` clears any state kept between moves
+ENGINES = {
+    "minimax": (ttt.minimax, tictactoe_stats, reset_tictactoe),
+    "search": (search_without_book, tictactoe_stats, reset_tictactoe),
+    "bitboard": (bitboard.minimax,
+                 lambda: {"nodes": bitboard.nodes_visited}, None),
+    "mnk": (mnk_game.minimax,
+            lambda: {"nodes": mnk_game.nodes_visited}, reset_mnk),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark tic-tac-toe engines by self-play."
+    )
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES),
+                        help="engine names or module.function paths")
+    parser.add_argument("--games", type=int, default=20,
+                        help="games per engine and opponent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON report file (default stdout)")
+    parser.add_argument("--csv", help="also write every move to this CSV file")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip tracing peak memory, which slows moves")
+    parser.add_argument("--baseline", help="JSON summary to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown over the baseline")
+    parser.add_argument("--save-baseline",
+                        help="write the summary to this file as a baseline")
+    args = parser.parse_args()
+
+    openings = make_openings(args.games, args.seed)
+    moves = []
+    summary = {}
+    for name in args.engines:
+        engine = resolve_engine(name)
+        engine_moves, results = run_engine(
+            engine, openings, args.seed, not args.no_memory
+        )
+        for move in engine_moves:
+            move["engine"] = name
+        moves.extend(engine_moves)
+        summary[name] = summarize(engine_moves, results)
+
+    report = {
+        "games": args.games,
+        "seed": args.seed,
+        "summary": summary,
+        "moves": moves,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.csv is not None:
+        write_csv(args.csv, moves)
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline, args.tolerance)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+def resolve_engine(name):
+    """
+    Returns the (move, stats, reset) functions of engine `name`.
+    """
+    if name in ENGINES:
+        return ENGINES[name]
+    module_name, _, function_name = name.rpartition(".")
+    if not module_name:
+        raise ValueError(f"unknown engine {name}")
+    module = importlib.import_module(module_name)
+    move = getattr(module, function_name)
+
+    def stats():
+        return {"nodes": getattr(module, "nodes_visited", None)}
+
+    return move, stats, None
+
+
+def make_openings(count, seed):
+    """
+    Returns `count` seeded openings, each a list of zero to two random
+    moves to play before the engines take over.
+    """
+    generator = random.Random(seed)
+    openings = []
+    for _ in range(count):
+        board = ttt.initial_state()
+        opening = []
+        for _ in range(generator.randint(0, 2)):
+            action = generator.choice(sorted(ttt.actions(board)))
+            opening.append(action)
+            board = ttt.result(board, action)
+        openings.append(opening)
+    return openings
+
+
+def run_engine(engine, openings, seed, trace_memory=True):
+    """
+    Plays each opening once with the engine on both sides, and twice
+    against a random player (once as X, once as O).
+
+    Returns the engine's move records and the list of game results:
+    "win", "draw" or "loss" for the engine against the random player,
+    and "self_decisive" or "self_draw" for a game against itself.
+    """
+    move, stats, reset = engine
+    if reset is not None:
+        reset()
+    generator = random.Random(seed)
+    records = []
+    results = []
+    for game, opening in enumerate(openings):
+        for opponent, side in [("self", None), ("random", ttt.X),
+                               ("random", ttt.O)]:
+            board = ttt.initial_state()
+            for action in opening:
+                board = ttt.result(board, action)
+            while not ttt.terminal(board):
+                mover = ttt.player(board)
+                if side is not None and mover != side:
+                    board = ttt.result(
+                        board, generator.choice(sorted(ttt.actions(board)))
+                    )
+                    continue
+                record = timed_move(move, stats, board, trace_memory)
+                record.update(game=game, opponent=opponent, player=mover)
+                records.append(record)
+                board = ttt.result(board, tuple(record["action"]))
+
+            winner = ttt.winner(board)
+            if side is None:
+                results.append("self_draw" if winner is None
+                               else "self_decisive")
+            elif winner is None:
+                results.append("draw")
+            else:
+                results.append("win" if winner == side else "loss")
+    return records, results
+
+
+def timed_move(move, stats, board, trace_memory):
+    """
+    Asks the engine for a move, returning a record of the action, wall
+    time, engine counters and peak bytes allocated.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    action = move(board)
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    record = {"ply": ttt.ply(board), "action": list(action),
+              "seconds": seconds, "peak_bytes": peak}
+    record.update(stats())
+    return record
+
+
+def summarize(moves, results):
+    """
+    Returns the summary metrics of an engine's moves and game results.
+    """
+    seconds = sorted(move["seconds"] for move in moves)
+    nodes = [move["nodes"] for move in moves if move.get("nodes") is not None]
+    hits = [move["cache_hits"] for move in moves
+            if move.get("cache_hits") is not None]
+    peaks = [move["peak_bytes"] for move in moves
+             if move["peak_bytes"] is not None]
+    return {
+        "moves": len(moves),
+        "total_seconds": sum(seconds),
+        "mean_seconds": statistics.fmean(seconds) if seconds else 0,
+        "p95_seconds": seconds[int(0.95 * (len(seconds) - 1))] if seconds else 0,
+        "max_seconds": seconds[-1] if seconds else 0,
+        "mean_nodes": statistics.fmean(nodes) if nodes else None,
+        "total_nodes": sum(nodes) if nodes else None,
+        "cache_hits": sum(hits) if hits else None,
+        "max_peak_bytes": max(peaks) if peaks else None,
+        "wins": results.count("win"),
+        "draws": results.count("draw"),
+        "losses": results.count("loss"),
+        "self_draws": results.count("self_draw"),
+        "self_decisive": results.count("self_decisive"),
+    }
+
+
+def compare(summary, baseline, tolerance):
+    """
+    Returns a description of each metric that got worse than the
+    baseline by more than `tolerance`, and of every game the engine
+    now loses more often.
+    """
+    regressions = []
+    for name, metrics in summary.items():
+        if name not in baseline:
+            continue
+        for metric in REGRESSION_METRICS + ["losses"]:
+            old, new = baseline[name].get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            limit = old if metric == "losses" else old * (1 + tolerance)
+            if new > limit:
+                regressions.append(
+                    f"{name}: {metric} went from {old:.6g} to {new:.6g}"
+                )
+    return regressions
+
+
+def write_csv(filename, moves):
+    columns = ["engine", "opponent", "game", "ply", "player", "action",
+               "seconds", "nodes", "cache_hits", "peak_bytes"]
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for move in moves:
+            writer.writerow(move)
+
+
+if __name__ == "__main__":
+    main()
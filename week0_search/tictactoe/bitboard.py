@@ -0,0 +1,193 @@
+"""
+Tic Tac Toe on bitboards.
+
+A board is a pair of 9-bit integers, the cells taken by X and by O,
+where cell (i, j) is bit 3i + j. Moves are a single bitwise or and
+wins are found by masking against the 8 lines, so searching allocates
+nothing per node.
+
+The functions mirroring the tictactoe module take and return the same
+list-of-lists boards, so runner.py can use this module instead.
+"""
+
+import math
+
+from tictactoe import MOVE_ORDER, O, X, initial_state
+
+FULL = 0b111111111
+
+# Masks of the rows, columns and diagonals
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+# WINNING[mask] is 1 if the cells in `mask` complete a line
+WINNING = bytes(
+    any(mask & line == line for line in LINES) for mask in range(FULL + 1)
+)
+
+# Bits of the cells in the order they are searched
+ORDERED_BITS = [1 << (3 * i + j) for i, j in MOVE_ORDER]
+
+# Number of positions visited by the last call to minimax
+nodes_visited = 0
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboards of a list-of-lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board of the (x, o) bitboards.
+    """
+    board = initial_state()
+    for cell in range(9):
+        if x >> cell & 1:
+            board[cell // 3][cell % 3] = X
+        elif o >> cell & 1:
+            board[cell // 3][cell % 3] = O
+    return board
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = from_board(board)
+    return O if x.bit_count() > o.bit_count() else X
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    x, o = from_board(board)
+    empty = FULL & ~(x | o)
+    return {(cell // 3, cell % 3) for cell in range(9) if empty >> cell & 1}
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+
+    # Fail like tictactoe.result on invalid actions
+    if i < 0 or j < 0:
+        raise NotImplementedError
+    x, o = from_board(board)
+    bit = 1 << (3 * i + j)
+    if j > 2 or bit > FULL:
+        raise IndexError("list index out of range")
+    if (x | o) & bit:
+        raise NotImplementedError
+    if x.bit_count() > o.bit_count():
+        return to_board(x, o | bit)
+    return to_board(x | bit, o)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = from_board(board)
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = from_board(board)
+    return bool(WINNING[x] or WINNING[o] or x | o == FULL)
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = from_board(board)
+    return 1 if WINNING[x] else -1 if WINNING[o] else 0
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    global nodes_visited
+    nodes_visited = 0
+
+    x, o = from_board(board)
+    if WINNING[x] or WINNING[o] or x | o == FULL:
+        return None
+    if x.bit_count() > o.bit_count():
+        bit = best_move(o, x)
+    else:
+        bit = best_move(x, o)
+    cell = bit.bit_length() - 1
+    return cell // 3, cell % 3
+
+
+def best_move(me, them):
+    """
+    Returns the bit of the best move for the player holding `me`
+    against `them`, with `me` to play.
+    """
+    best_bit = None
+    alpha = -math.inf
+    empty = FULL & ~(me | them)
+    for bit in ORDERED_BITS:
+        if empty & bit:
+            score = -negamax(them, me | bit, -math.inf, -alpha)
+            if score > alpha:
+                alpha = score
+                best_bit = bit
+            if alpha == 1:
+                break
+    return best_bit
+
+
+def negamax(me, them, alpha, beta):
+    """
+    Returns the value of the position for the player holding `me`, who
+    is to move: 1 for a win, -1 for a loss and 0 for a draw, searched
+    with alpha-beta pruning.
+    """
+    global nodes_visited
+    nodes_visited += 1
+
+    # Only the player who just moved can have completed a line
+    if WINNING[them]:
+        return -1
+    empty = FULL & ~(me | them)
+    if not empty:
+        return 0
+
+    value = -math.inf
+    for bit in ORDERED_BITS:
+        if empty & bit:
+            score = -negamax(them, me | bit, -beta, -alpha)
+            if score > value:
+                value = score
+                if value > alpha:
+                    alpha = value
+                if alpha >= beta or value == 1:
+                    break
+    return value
@@ -0,0 +1,76 @@
+"""
+Builds the tic-tac-toe opening book.
+
+Solves every position reachable from the empty board and writes one
+byte per base-3 board code (see tictactoe.encode) to book.bin: the low
+four bits hold the best cell 3i + j (15 if the game is over) and the
+high four bits the game value plus one. Codes of unreachable boards
+hold 255.
+
+Usage: python book.py [output]
+"""
+
+import sys
+
+import tictactoe as ttt
+
+NO_MOVE = 15
+UNREACHABLE = 255
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [output]")
+    filename = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_FILE
+    book = build_book()
+    with open(filename, "wb") as f:
+        f.write(book)
+    positions = sum(entry != UNREACHABLE for entry in book)
+    print(f"Wrote {positions} positions to {filename}.")
+
+
+def build_book():
+    """
+    Returns the book as a bytearray indexed by board code.
+    """
+    book = bytearray([UNREACHABLE]) * 3 ** 9
+    solutions = {}
+    solve(ttt.initial_state(), solutions)
+    for code, (value, _, cell) in solutions.items():
+        book[code] = (value + 1) << 4 | (NO_MOVE if cell is None else cell)
+    return book
+
+
+def solve(board, solutions):
+    """
+    Returns (value, moves, cell) for the board: its game value, the
+    number of moves until the game ends under best play, and the cell
+    of the best move. Ties prefer the fastest win or slowest loss, then
+    the tictactoe search order. Records every solved board in
+    `solutions` by code.
+    """
+    code = ttt.encode(board)
+    if code in solutions:
+        return solutions[code]
+
+    if ttt.terminal(board):
+        solution = (ttt.utility(board), 0, None)
+    else:
+        sign = 1 if ttt.player(board) == ttt.X else -1
+        best = None
+        for action in sorted(ttt.actions(board), key=ttt.MOVE_ORDER.index):
+            value, moves, _ = solve(ttt.result(board, action), solutions)
+
+            # Better for the mover: higher value, then a quicker win
+            # or a slower loss
+            rank = (sign * value, -moves if sign * value >= 0 else moves)
+            if best is None or rank > best[0]:
+                best = (rank, value, moves + 1, action[0] * 3 + action[1])
+        solution = best[1:]
+
+    solutions[code] = solution
+    return solution
+
+
+if __name__ == "__main__":
+    main()
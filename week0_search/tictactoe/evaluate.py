@@ -0,0 +1,126 @@
+"""
+Batch evaluation of tic-tac-toe positions.
+
+`evaluate` takes any iterable of boards and yields, one at a time and in
+order, the game value of each, every optimal move and the number of
+moves until the game ends. Boards are solved under their canonical form
+(see tictactoe.canonical) in a cache shared by all calls, which holds at
+most one entry per position up to symmetry, so memory stays bounded
+however many boards are evaluated.
+
+Usage: python evaluate.py < boards > results.jsonl
+
+Reads one board per line as 9 characters X, O or "." in row order and
+writes one JSON object per line, or {"line": n, "error": ...} for a line
+that is not a board.
+"""
+
+import json
+import sys
+
+import tictactoe as ttt
+
+# Maps canonical board codes to (value, depth, cells): the game value,
+# the moves left under best play and the cell numbers 3i + j of the
+# canonical board's optimal moves
+solved_positions = {}
+
+MARKS = {"X": ttt.X, "O": ttt.O, ".": ttt.EMPTY}
+
+
+def main():
+    if len(sys.argv) != 1:
+        sys.exit("Usage: python evaluate.py < boards > results.jsonl")
+    for line, text in enumerate(sys.stdin, 1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            board = parse(text)
+        except ValueError as error:
+            print(json.dumps({"line": line, "error": str(error)}))
+            continue
+        for evaluation in evaluate([board]):
+            evaluation["board"] = format_board(evaluation["board"])
+            print(json.dumps(evaluation))
+
+
+def evaluate(boards):
+    """
+    Yields a dictionary for each board with the `board`, its game
+    `value` (1 if X wins, -1 if O wins, 0 for a draw, under best play),
+    the `moves` (i, j) reaching that value and the `depth`, the number
+    of moves until the game ends when the winner wins as fast and the
+    loser loses as slowly as they can. Finished games have no moves.
+    """
+    for board in boards:
+        value, depth, moves = solve(board)
+        yield {"board": board, "value": value, "moves": moves,
+               "depth": depth}
+
+
+def solve(board):
+    """
+    Returns (value, depth, moves) for the board, as for `evaluate`,
+    with the moves in tictactoe search order.
+    """
+    code, symmetry = ttt.canonical(board)
+    if code not in solved_positions:
+        solved_positions[code] = solve_canonical(board, symmetry)
+    value, depth, cells = solved_positions[code]
+    permutation = ttt.SYMMETRIES[symmetry]
+    moves = [ttt.CELLS[permutation[cell]] for cell in cells]
+    return value, depth, sorted(moves, key=ttt.MOVE_ORDER.index)
+
+
+def solve_canonical(board, symmetry):
+    """
+    Solves the board, returning its entry for `solved_positions` with
+    the moves as cells of the canonical board, which holds cell
+    SYMMETRIES[symmetry][k] of `board` at cell k.
+    """
+    if ttt.terminal(board):
+        return ttt.utility(board), 0, ()
+
+    sign = 1 if ttt.player(board) == ttt.X else -1
+    children = {}
+    for action in ttt.actions(board):
+        value, depth, _ = solve(ttt.result(board, action))
+        children[action] = (value, depth)
+
+    value = max(children.values(), key=lambda child: sign * child[0])[0]
+    depths = [depth for child_value, depth in children.values()
+              if child_value == value]
+
+    # The winner (or anybody, in a draw) hurries, the loser stalls
+    depth = 1 + (max(depths) if sign * value < 0 else min(depths))
+
+    permutation = ttt.SYMMETRIES[symmetry]
+    cells = tuple(sorted(
+        permutation.index(3 * i + j)
+        for (i, j), (child_value, _) in children.items()
+        if child_value == value
+    ))
+    return value, depth, cells
+
+
+def parse(text):
+    """
+    Returns the board written as 9 characters X, O or "." in row order.
+    """
+    if len(text) != 9 or any(mark not in MARKS for mark in text):
+        raise ValueError(f"invalid board {text!r}")
+    marks = [MARKS[mark] for mark in text]
+    return [marks[0:3], marks[3:6], marks[6:9]]
+
+
+def format_board(board):
+    """
+    Returns the board as 9 characters X, O or "." in row order.
+    """
+    return "".join("." if cell is ttt.EMPTY else cell
+                   for row in board for cell in row)
+
+
+if __name__ == "__main__":
+    main()
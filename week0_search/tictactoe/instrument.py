@@ -0,0 +1,148 @@
+"""
+Opt-in counters and timers for the game engines.
+
+Instrumentation is off until `enable` installs a Recorder; until then
+each hook in an engine costs a single check of `recorder`. Counters and
+timings can be read from the recorder after every move, or exported as
+Prometheus text or as folded stacks for flame graph tools.
+
+    import instrument
+    recorder = instrument.enable()
+    ...play some moves...
+    print(recorder.prometheus())
+"""
+
+import time
+
+# The active Recorder, or None when instrumentation is off
+recorder = None
+
+
+class Recorder():
+
+    def __init__(self):
+        # Map (name, labels) to a count, or to [total seconds, count]
+        # for timings, where labels is a tuple of (label, value) pairs
+        self.counters = {}
+        self.timings = {}
+
+        # Self time in seconds of each stack of spans, and the spans
+        # now open as [name, start time, time spent in children]
+        self.stacks = {}
+        self.open_spans = []
+
+    def count(self, name, labels=(), amount=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, labels=()):
+        """Adds one timing of `seconds` to the timing `name`."""
+        timing = self.timings.setdefault((name, labels), [0.0, 0])
+        timing[0] += seconds
+        timing[1] += 1
+
+    def value(self, name, labels=()):
+        """Returns the count of counter `name`, 0 if never counted."""
+        return self.counters.get((name, labels), 0)
+
+    def ratio(self, name, total, labels=()):
+        """
+        Returns counter `name` as a fraction of counter `total`, such as
+        cache hits out of lookups, or None if `total` is 0.
+        """
+        if not self.value(total, labels):
+            return None
+        return self.value(name, labels) / self.value(total, labels)
+
+    def start_span(self, name):
+        """
+        Starts timing `name` as part of the spans already open.
+        """
+        self.open_spans.append([name, time.perf_counter(), 0.0])
+
+    def end_span(self):
+        """
+        Ends the innermost open span, returning its duration in seconds.
+        """
+        name, start, children = self.open_spans[-1]
+        seconds = time.perf_counter() - start
+        stack = ";".join(span[0] for span in self.open_spans)
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + seconds - children
+        self.open_spans.pop()
+        if self.open_spans:
+            self.open_spans[-1][2] += seconds
+        return seconds
+
+    def snapshot(self):
+        """
+        Returns a copy of the counters and timings, to compare with a
+        later snapshot.
+        """
+        return {
+            "counters": dict(self.counters),
+            "timings": {key: tuple(timing)
+                        for key, timing in self.timings.items()},
+        }
+
+    def reset(self):
+        self.counters.clear()
+        self.timings.clear()
+        self.stacks.clear()
+
+    def prometheus(self, prefix=""):
+        """
+        Returns the counters and timings in the Prometheus text format,
+        timings as a `_seconds_sum` and `_seconds_count` pair.
+        """
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {prefix}{name} counter")
+            for (other, labels), count in sorted(self.counters.items()):
+                if other == name:
+                    lines.append(
+                        f"{prefix}{name}{format_labels(labels)} {count}"
+                    )
+        for name in sorted({name for name, _ in self.timings}):
+            lines.append(f"# TYPE {prefix}{name}_seconds summary")
+            for (other, labels), (seconds, count) in sorted(
+                self.timings.items()
+            ):
+                if other == name:
+                    text = format_labels(labels)
+                    lines.append(f"{prefix}{name}_seconds_sum{text} {seconds}")
+                    lines.append(f"{prefix}{name}_seconds_count{text} {count}")
+        return "\n".join(lines) + "\n"
+
+    def folded(self):
+        """
+        Returns the self time of every stack of spans in microseconds,
+        one "outer;inner count" line each, as read by flamegraph.pl and
+        speedscope.
+        """
+        return "".join(f"{stack} {round(seconds * 1e6)}\n"
+                       for stack, seconds in sorted(self.stacks.items()))
+
+
+def enable():
+    """
+    Turns instrumentation on, returning the new active Recorder.
+    """
+    global recorder
+    recorder = Recorder()
+    return recorder
+
+
+def disable():
+    """
+    Turns instrumentation off, returning the Recorder that was active.
+    """
+    global recorder
+    previous, recorder = recorder, None
+    return previous
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{label}="{value}"' for label, value in labels)
+    return "{" + pairs + "}"
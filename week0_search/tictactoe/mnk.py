@@ -0,0 +1,349 @@
+"""
+m,n,k-games: tic-tac-toe generalized to boards of any size, won by
+getting k marks in a row.
+
+A `Game` offers the same player, actions, result, winner, terminal,
+utility and minimax functions as the tictactoe module, on list-of-lists
+boards of its size. Game(3, 3, 3) is tic-tac-toe.
+
+Bigger boards are too large to search exhaustively, so minimax deepens
+its search one move at a time until a time limit, scoring unfinished
+positions with a heuristic, and returns the best move of the deepest
+search completed. Wins are detected by looking only at the lines
+through the last move.
+"""
+
+import math
+import random
+import time
+
+from tictactoe import EMPTY, O, X, SearchTimeout
+
+# Score of a won game; wins in fewer moves score higher
+WIN = 10 ** 9
+
+# Positions searched between checks of the time limit
+CHECK_INTERVAL = 1024
+
+# Transposition table entries kept before the table is cleared
+MAX_TABLE_SIZE = 1000000
+
+# Kinds of value stored in the transposition table
+EXACT, LOWER, UPPER = "exact", "lower", "upper"
+
+# Directions of the lines through a cell
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+
+class Game():
+
+    def __init__(self, rows=3, columns=3, k=3):
+        if min(rows, columns, k) < 1 or k > max(rows, columns):
+            raise ValueError("invalid board size or line length")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.size = rows * columns
+
+        # Every run of k cells in a line, as flat cell numbers
+        self.windows = []
+        for i in range(rows):
+            for j in range(columns):
+                for di, dj in DIRECTIONS:
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < columns:
+                        self.windows.append(tuple(
+                            (i + di * step) * columns + j + dj * step
+                            for step in range(k)
+                        ))
+
+        # Cells closest to the center are searched first
+        center_i, center_j = (rows - 1) / 2, (columns - 1) / 2
+        self.order = sorted(
+            range(self.size),
+            key=lambda cell: (abs(cell // columns - center_i)
+                              + abs(cell % columns - center_j))
+        )
+
+        # Random keys for incremental (Zobrist) hashing of positions
+        generator = random.Random(0)
+        self.keys = {
+            X: [generator.getrandbits(64) for _ in range(self.size)],
+            O: [generator.getrandbits(64) for _ in range(self.size)],
+        }
+
+        # Maps position hashes to (depth, value, bound, best cell)
+        self.table = {}
+
+        # Statistics of the last call to minimax
+        self.nodes_visited = 0
+        self.depth_reached = 0
+
+        self.deadline = None
+        self.stop = None
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.columns for _ in range(self.rows)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        flat_board = [cell for row in board for cell in row]
+        if flat_board.count(X) > flat_board.count(O):
+            return O
+        return X
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i, row in enumerate(board)
+                for j, cell in enumerate(row) if cell is EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+
+        # Fail like tictactoe.result on invalid actions
+        if i < 0 or j < 0:
+            raise NotImplementedError
+        if board[i][j] is not EMPTY:
+            raise NotImplementedError
+        new_board = [list(row) for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        cells = flatten(board)
+        for cell in range(self.size):
+            if cells[cell] is not EMPTY and self.wins_at(cells, cell):
+                return cells[cell]
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (self.winner(board) is not None
+                or all(cell is not EMPTY for row in board for cell in row))
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        winner = self.winner(board)
+        return 1 if winner == X else -1 if winner == O else 0
+
+    def minimax(self, board, time_limit=None, stop=None):
+        """
+        Returns the best action found for the current player on the
+        board, or None if the game is over.
+
+        Searches one move deeper at a time until the game is solved,
+        `time_limit` seconds pass or `stop` (a threading.Event) is set,
+        keeping the best action of the deepest complete search.
+        """
+        self.nodes_visited = 0
+        self.depth_reached = 0
+        if self.terminal(board):
+            return None
+
+        cells = flatten(board)
+        mover = self.player(board)
+        stones = sum(cell is not EMPTY for cell in cells)
+        self.deadline = None if time_limit is None else (
+            time.monotonic() + time_limit
+        )
+        self.stop = stop
+        if len(self.table) > MAX_TABLE_SIZE:
+            self.table.clear()
+
+        best = next(cell for cell in self.order if cells[cell] is EMPTY)
+        try:
+            for depth in range(1, self.size - stones + 1):
+                value, best = self.search_root(cells, mover, stones, depth,
+                                               best)
+                self.depth_reached = depth
+
+                # Stop once the game is decided
+                if abs(value) >= WIN - self.size:
+                    break
+        except SearchTimeout:
+            pass
+        return best // self.columns, best % self.columns
+
+    def search_root(self, cells, mover, stones, depth, first):
+        """
+        Returns (value, cell) for the best move of `mover` searched to
+        `depth` moves, trying cell `first` before the others.
+        """
+        alpha, beta = -math.inf, math.inf
+        best = None
+        position = hash_cells(self.keys, cells)
+        moves = [first] + [cell for cell in self.order
+                           if cells[cell] is EMPTY and cell != first]
+        for cell in moves:
+            cells[cell] = mover
+            try:
+                score = -self.negamax(
+                    cells, depth - 1, -beta, -alpha, other(mover), cell,
+                    stones + 1, position ^ self.keys[mover][cell]
+                )
+            finally:
+                cells[cell] = EMPTY
+            if best is None or score > alpha:
+                alpha = score
+                best = cell
+        return alpha, best
+
+    def negamax(self, cells, depth, alpha, beta, mover, last, stones,
+                position):
+        """
+        Returns the value of the position for `mover`, searched `depth`
+        more moves deep with alpha-beta pruning, where `last` is the
+        cell just played and `stones` the number of marks on the board.
+        """
+        self.nodes_visited += 1
+        if self.nodes_visited % CHECK_INTERVAL == 0:
+            self.check_time()
+
+        # Only the player who just moved can have won
+        if self.wins_at(cells, last):
+            return -(WIN - stones)
+        if stones == self.size:
+            return 0
+        if depth == 0:
+            return self.evaluate(cells, mover)
+
+        alpha_searched = alpha
+        first = None
+        entry = self.table.get(position)
+        if entry is not None:
+            entry_depth, value, bound, first = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return value
+                if bound == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        value = -math.inf
+        best = None
+        for cell in self.ordered_moves(cells, first):
+            cells[cell] = mover
+            try:
+                score = -self.negamax(
+                    cells, depth - 1, -beta, -alpha, other(mover), cell,
+                    stones + 1, position ^ self.keys[mover][cell]
+                )
+            finally:
+                cells[cell] = EMPTY
+            if score > value:
+                value = score
+                best = cell
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+
+        if value <= alpha_searched:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table[position] = (depth, value, bound, best)
+        return value
+
+    def ordered_moves(self, cells, first):
+        """
+        Returns the empty cells, `first` and then cells next to a mark
+        before the rest, each group by distance to the center.
+        """
+        columns = self.columns
+        near, far = [], []
+        for cell in self.order:
+            if cells[cell] is not EMPTY or cell == first:
+                continue
+            i, j = divmod(cell, columns)
+            if any(cells[ni * columns + nj] is not EMPTY
+                   for ni in range(max(i - 1, 0), min(i + 2, self.rows))
+                   for nj in range(max(j - 1, 0), min(j + 2, columns))):
+                near.append(cell)
+            else:
+                far.append(cell)
+        return ([first] if first is not None else []) + near + far
+
+    def wins_at(self, cells, cell):
+        """
+        Returns True if the mark at `cell` is part of k in a row.
+        """
+        mark = cells[cell]
+        i, j = divmod(cell, self.columns)
+        for di, dj in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                ni, nj = i + sign * di, j + sign * dj
+                while (0 <= ni < self.rows and 0 <= nj < self.columns
+                       and cells[ni * self.columns + nj] == mark):
+                    count += 1
+                    ni, nj = ni + sign * di, nj + sign * dj
+            if count >= self.k:
+                return True
+        return False
+
+    def evaluate(self, cells, mover):
+        """
+        Heuristic value of an unfinished position for `mover`: every run
+        of k cells holding marks of only one player counts for that
+        player, more the more marks it holds.
+        """
+        score = 0
+        for window in self.windows:
+            x = o = 0
+            for cell in window:
+                if cells[cell] == X:
+                    x += 1
+                elif cells[cell] == O:
+                    o += 1
+            if x and not o:
+                score += 4 ** x
+            elif o and not x:
+                score -= 4 ** o
+        return score if mover == X else -score
+
+    def check_time(self):
+        if self.stop is not None and self.stop.is_set():
+            raise SearchTimeout
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchTimeout
+
+
+def flatten(board):
+    return [cell for row in board for cell in row]
+
+
+def other(mover):
+    return O if mover == X else X
+
+
+def hash_cells(keys, cells):
+    """
+    Returns the Zobrist hash of the marks on the flat board `cells`.
+    """
+    position = 0
+    for cell, mark in enumerate(cells):
+        if mark is not EMPTY:
+            position ^= keys[mark][cell]
+    return position
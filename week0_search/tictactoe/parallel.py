@@ -0,0 +1,232 @@
+"""
+Parallel search of m,n,k-games across a process pool.
+
+Each iteration of the deepening search splits the position at its root
+moves, or at the replies to them when there are fewer root moves than
+twice the workers, and searches the parts in worker processes. Workers
+share the best root value found so far, so moves searched after a good
+one only need to prove they are no better.
+
+Every part is searched with an empty transposition table and results
+are merged in move order, so the move chosen never depends on which
+worker finished first. A move is only compared by its exact value: a
+move searched against a shared bound it could not reach is known to be
+worse than the move that set it.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+
+from mnk import WIN, Game, flatten, hash_cells, other
+from tictactoe import EMPTY, SearchTimeout
+
+# Lower than any value, as the shared bound cannot hold -math.inf
+LOWEST = -2 * WIN
+
+# Seconds between checks of the stop event while waiting for workers
+POLL_INTERVAL = 0.05
+
+# The game, shared bound and stop event of a worker process
+worker_game = None
+worker_bound = None
+worker_stop = None
+
+
+class ParallelSearch():
+
+    def __init__(self, rows=3, columns=3, k=3, workers=None):
+        self.game = Game(rows, columns, k)
+        self.workers = workers or os.cpu_count() or 1
+        self.bound = multiprocessing.Value("q", LOWEST)
+        self.stop = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(
+            self.workers, initializer=start_worker,
+            initargs=(rows, columns, k, self.bound, self.stop)
+        )
+
+        # Statistics of the last call to minimax
+        self.nodes_visited = 0
+        self.depth_reached = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def minimax(self, board, time_limit=None, stop=None, max_depth=None):
+        """
+        Returns the best action found for the current player on the
+        board, or None if the game is over, like mnk.Game.minimax.
+
+        Searches one move deeper at a time until the game is solved,
+        `max_depth` is reached, `time_limit` seconds pass or `stop` (a
+        threading.Event) is set.
+        """
+        game = self.game
+        self.nodes_visited = 0
+        self.depth_reached = 0
+        if game.terminal(board):
+            return None
+
+        cells = flatten(board)
+        mover = game.player(board)
+        stones = sum(cell is not EMPTY for cell in cells)
+        deadline = None if time_limit is None else (
+            time.monotonic() + time_limit
+        )
+        self.stop.clear()
+
+        moves = [cell for cell in game.order if cells[cell] is EMPTY]
+        best = moves[0]
+        last_depth = game.size - stones
+        if max_depth is not None:
+            last_depth = min(last_depth, max_depth)
+        for depth in range(1, last_depth + 1):
+            moves.remove(best)
+            moves.insert(0, best)
+            values = self.search_moves(cells, mover, stones, depth, moves,
+                                       deadline, stop)
+            if values is None:
+                break
+
+            # The first move with the highest exact value wins
+            value = max(value for value in values if value is not None)
+            best = moves[values.index(value)]
+            self.depth_reached = depth
+            if abs(value) >= WIN - game.size:
+                break
+        return best // game.columns, best % game.columns
+
+    def search_moves(self, cells, mover, stones, depth, moves, deadline,
+                     stop):
+        """
+        Returns the value for `mover` of each of `moves` searched to
+        `depth`, or None for the moves proven worse than the best, or
+        None instead of the list if the search was stopped.
+        """
+        game = self.game
+        self.bound.value = LOWEST
+
+        # Split at the replies if there are too few moves to go round.
+        # Tasks get a snapshot of the board, as the pool pickles their
+        # arguments later, while the next moves are being tried
+        split_replies = depth > 1 and len(moves) < 2 * self.workers
+        tasks = []
+        for cell in moves:
+            cells[cell] = mover
+            if split_replies and not (game.wins_at(cells, cell)
+                                      or stones + 1 == game.size):
+                replies = [reply for reply in game.order
+                           if cells[reply] is EMPTY]
+                tasks.append([self.pool.apply_async(
+                    search_part, (tuple(cells), mover, (cell, reply), depth,
+                                  deadline)
+                ) for reply in replies])
+            else:
+                tasks.append([self.pool.apply_async(
+                    search_part, (tuple(cells), mover, (cell,), depth, deadline)
+                )])
+            cells[cell] = EMPTY
+
+        # Merge in move order, whichever order the workers finish in
+        values = []
+        for parts in tasks:
+            results = [self.wait(part, stop) for part in parts]
+            if None in results:
+                # Let the parts still queued return before the next search
+                self.stop.set()
+                for part in [part for parts in tasks for part in parts]:
+                    part.wait()
+                return None
+            self.nodes_visited += sum(nodes for _, nodes in results)
+            if len(results) == 1:
+                values.append(results[0][0])
+            else:
+                # The move is worth the opponent's best reply
+                values.append(min(value for value, _ in results))
+        return values
+
+    def wait(self, part, stop):
+        """
+        Returns the result of a search part, setting the workers' stop
+        event once `stop` is set.
+        """
+        while not part.ready():
+            if stop is not None and stop.is_set():
+                self.stop.set()
+            part.wait(POLL_INTERVAL)
+        return part.get()
+
+
+def start_worker(rows, columns, k, bound, stop):
+    global worker_game, worker_bound, worker_stop
+    worker_game = Game(rows, columns, k)
+    worker_bound = bound
+    worker_stop = stop
+
+
+def search_part(cells, mover, played, depth, deadline):
+    """
+    Returns (value, nodes) for the position reached by `mover` and its
+    opponent taking turns to play the cells in `played`, searched to
+    `depth` moves from the root, or None if the search ran out of time
+    or was stopped.
+
+    The value is for the player who moved first in `played`, and None
+    for a single root move proven no better than the shared bound.
+    """
+    game = worker_game
+    game.table.clear()
+    game.nodes_visited = 0
+    game.deadline = deadline
+    game.stop = worker_stop
+
+    cells = list(cells)
+    stones = sum(cell is not EMPTY for cell in cells)
+    for cell in played:
+        cells[cell] = mover
+        mover = other(mover)
+    position = hash_cells(game.keys, cells)
+    stones += len(played)
+    remaining = depth - len(played)
+
+    try:
+        game.check_time()
+        if len(played) == 1:
+            # Values equal to the bound are still exact, so that ties
+            # are broken by move order rather than by timing
+            bound = worker_bound.value
+            alpha = -math.inf if bound == LOWEST else bound - 1
+            value = -game.negamax(cells, remaining, -math.inf, -alpha, mover,
+                                  played[-1], stones, position)
+            if value <= alpha:
+                return None, game.nodes_visited
+            with worker_bound.get_lock():
+                if value > worker_bound.value:
+                    worker_bound.value = value
+        else:
+            value = game.negamax(cells, remaining, -math.inf, math.inf, mover,
+                                 played[-1], stones, position)
+    except SearchTimeout:
+        return None
+    return value, game.nodes_visited
+
+
+if __name__ == "__main__":
+    # Compare one worker with all of them on the opening of a bigger game
+    rows, columns, k, depth = 5, 5, 4, 5
+    for workers in [1, None]:
+        with ParallelSearch(rows, columns, k, workers) as search:
+            board = search.game.initial_state()
+            start = time.perf_counter()
+            action = search.minimax(board, max_depth=depth)
+            seconds = time.perf_counter() - start
+            print(f"{search.workers} workers: {action} in {seconds:.2f}s "
+                  f"({search.nodes_visited} nodes)")
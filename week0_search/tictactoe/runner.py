@@ -1,11 +1,20 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Seconds the computer may think about each move
+time_limit = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+
+# Seconds a computer move stays "thinking" at least, so it can be seen
+AI_DELAY = 0.5
+
 pygame.init()
 size = width, height = 600, 400
+clock = pygame.time.Clock()
 
 # Colors
 black = (0, 0, 0)
@@ -19,13 +28,37 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The computer searches in a background thread; the main loop polls
+# `ai_future` for its move and sets `ai_stop` to abandon the search
+executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+ai_stop = None
+ai_started = 0
+
+
+def cancel_ai():
+    """
+    Stops any search in progress and forgets its move.
+    """
+    global ai_future, ai_stop
+    if ai_stop is not None:
+        ai_stop.set()
+    ai_future = None
+    ai_stop = None
+
 
 while True:
 
+    # Position of this frame's mouse click, if any
+    click = None
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai()
+            executor.shutdown(wait=False)
             sys.exit()
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            click = event.pos
 
     screen.fill(black)
 
@@ -54,14 +87,10 @@ while True:
         screen.blit(playO, playORect)
 
         # Check if button is clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if playXButton.collidepoint(mouse):
-                time.sleep(0.2)
+        if click is not None:
+            if playXButton.collidepoint(click):
                 user = ttt.X
-            elif playOButton.collidepoint(mouse):
-                time.sleep(0.2)
+            elif playOButton.collidepoint(click):
                 user = ttt.O
 
     else:
@@ -102,29 +131,33 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (int(time.monotonic() * 3) % 3 + 1)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI search, or make its move once it is done
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_future is None:
+                ai_stop = threading.Event()
+                ai_future = executor.submit(
+                    ttt.minimax, board, time_limit, ai_stop
+                )
+                ai_started = time.monotonic()
+            elif (ai_future.done()
+                  and time.monotonic() - ai_started >= AI_DELAY):
+                move = ai_future.result()
+                ai_future = None
+                ai_stop = None
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
 
         # Check for a user move
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
-            mouse = pygame.mouse.get_pos()
+        if click is not None and user == player and not game_over:
             for i in range(3):
                 for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
+                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(click)):
                         board = ttt.result(board, (i, j))
 
         if game_over:
@@ -134,13 +167,10 @@ while True:
             againRect.center = againButton.center
             pygame.draw.rect(screen, white, againButton)
             screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+            if click is not None and againButton.collidepoint(click):
+                cancel_ai()
+                user = None
+                board = ttt.initial_state()
 
     pygame.display.flip()
+    clock.tick(30)
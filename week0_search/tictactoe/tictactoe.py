@@ -4,6 +4,10 @@ Tic Tac Toe Player
 
 import math
 import copy
+import os
+import time
+
+import instrument
 
 X = "X"
 O = "O"
@@ -13,6 +17,71 @@ board = [[EMPTY, EMPTY, EMPTY],
          [EMPTY, EMPTY, EMPTY],
          [EMPTY, EMPTY, EMPTY]]
 
+# Cells tried first when searching: center, then corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Last action to cause a cutoff at each ply (killer moves)
+killers = {}
+
+# Weighted count of the cutoffs caused by each action (history heuristic)
+history = {}
+
+# Number of boards visited by the last call to minimax
+nodes_visited = 0
+
+# Cells in the order of the digits of `encode`
+CELLS = [(i, j) for i in range(3) for j in range(3)]
+
+CELL_DIGITS = {EMPTY: 0, X: 1, O: 2}
+
+# The rotations and reflections of the board, as permutations of cell
+# numbers 3i + j: the transformed board has cell `permutation[k]` of the
+# original board at cell k
+SYMMETRIES = []
+for transform in [
+    lambda i, j: (i, j), lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j), lambda i, j: (2 - i, j),
+    lambda i, j: (j, i), lambda i, j: (2 - j, 2 - i),
+]:
+    SYMMETRIES.append([3 * i + j for i, j in
+                       (transform(*cell) for cell in CELLS)])
+
+# Kinds of value stored in the transposition table
+EXACT, LOWER, UPPER = "exact", "lower", "upper"
+
+# Maps canonical board codes to (value, bound, best move), where the
+# best move is a cell number of the canonical board. Kept across calls
+# to minimax.
+transposition_table = {}
+
+# Number of transposition table lookups by the last call to minimax, and
+# of those that ended a search
+table_probes = 0
+table_hits = 0
+
+# Boards searched between checks of the time limit
+CHECK_INTERVAL = 256
+
+# Time at which the current search must stop, if limited
+deadline = None
+
+# Event that stops the current search when set, if any
+stop_event = None
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when time runs out or it is stopped."""
+
+
+# Precomputed best moves and values of every reachable board, written
+# by book.py
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Labels of this engine's counters when instrumentation is on
+ENGINE_LABELS = (("engine", "tictactoe"),)
+
 
 def initial_state():
     """
@@ -101,6 +170,9 @@ def terminal(board):
     Returns True if game is over, False otherwise.
     """
 
+    if instrument.recorder is not None:
+        instrument.recorder.count("terminal_checks_total", ENGINE_LABELS)
+
     is_there_winner, _ = three_subsequents(board)
 
     # If there is a winner or all elements are not empty
@@ -130,22 +202,97 @@ def utility(board):
     raise NotImplementedError
 
 
-def minimax(board):
+def minimax(board, time_limit=None, stop=None):
     """
     Returns the optimal action for the current player on the board.
+
+    If searching takes more than `time_limit` seconds or `stop` (a
+    threading.Event) is set, returns the most promising action so far.
+    """
+    recorder = instrument.recorder
+    if recorder is None:
+        return search(board, time_limit, stop)
+
+    recorder.start_span("tictactoe")
+    recorder.start_span(f"ply {ply(board)}")
+    try:
+        return search(board, time_limit, stop)
+    finally:
+        recorder.end_span()
+        seconds = recorder.end_span()
+        recorder.observe("move", seconds,
+                         ENGINE_LABELS + (("ply", ply(board)),))
+        recorder.count("nodes_expanded_total", ENGINE_LABELS, nodes_visited)
+        recorder.count("cache_lookups_total", ENGINE_LABELS, table_probes)
+        recorder.count("cache_hits_total", ENGINE_LABELS, table_hits)
+
+
+def search(board, time_limit=None, stop=None):
+    """
+    Returns the action minimax chooses for the board.
+    """
+    global nodes_visited, table_probes, table_hits, deadline, stop_event
+    nodes_visited = 0
+    table_probes = 0
+    table_hits = 0
+
+    entry = book_entry(board)
+    if entry is not None:
+        return entry[0]
+
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    stop_event = stop
+    try:
+        if player(board) == X:
+            opt_action, _ = max_value(board)
+        else:
+            opt_action, _ = min_value(board)
+    except SearchTimeout:
+        _, _, _, opt_action = probe(board, -math.inf, math.inf)
+        if opt_action is None:
+            opt_action = ordered_actions(board)[0]
+    finally:
+        deadline = None
+        stop_event = None
+    return opt_action
+
+
+def check_time():
     """
+    Raises SearchTimeout if the search is out of time or was stopped.
+    """
+    if stop_event is not None and stop_event.is_set():
+        raise SearchTimeout
+    if deadline is not None and time.monotonic() > deadline:
+        raise SearchTimeout
 
-    current_player = player(board)
 
-    if current_player == X:
-        opt_action, _ = min_value(board)
-        return opt_action
-    else:
-        opt_action, _ = min_value(board)
-        print(opt_action)
-        return opt_action
+def load_book():
+    """
+    Returns the contents of the opening book, or None if it has not
+    been built.
+    """
+    try:
+        with open(BOOK_FILE, "rb") as f:
+            book = f.read()
+    except OSError:
+        return None
+    return book if len(book) == 3 ** 9 else None
 
-    raise NotImplementedError
+
+def book_entry(board):
+    """
+    Returns (action, value) for the board from the opening book, or None
+    if the board is not in it. The action is None for finished games.
+    """
+    if opening_book is None:
+        return None
+    entry = opening_book[encode(board)]
+    if entry == 255:
+        return None
+    cell = entry & 15
+    action = None if cell == 15 else CELLS[cell]
+    return action, (entry >> 4) - 1
 
 
 def three_subsequents(board):
@@ -174,57 +321,190 @@ def three_subsequents(board):
     return False, None
 
 
-def max_value(board):
+def ordered_actions(board, first=None):
+    """
+    Returns the available actions: `first`, then the killer move for
+    this ply, then by history of cutoffs, then center, corners and edges.
+    """
+    killer = killers.get(ply(board))
+
+    def priority(action):
+        return (action != first, action != killer,
+                -history.get(action, 0), MOVE_ORDER.index(action))
+
+    return sorted(actions(board), key=priority)
+
+
+def record_cutoff(board, action):
+    """
+    Remembers that `action` refuted the opponent's move on `board`.
+    """
+    killers[ply(board)] = action
+    history[action] = history.get(action, 0) + (10 - ply(board)) ** 2
+
+
+def ply(board):
+    """
+    Returns the number of moves made on the board.
+    """
+    return sum(cell is not EMPTY for row in board for cell in row)
+
+
+def encode(board):
+    """
+    Returns the board as a base-3 integer: cell (i, j) is digit 3i + j,
+    with 0 for EMPTY, 1 for X and 2 for O.
+    """
+    code = 0
+    for cell in reversed([cell for row in board for cell in row]):
+        code = code * 3 + CELL_DIGITS[cell]
+    return code
+
+
+def canonical(board):
+    """
+    Returns (code, symmetry): the smallest `encode` of the board over its
+    8 rotations and reflections, and the index in SYMMETRIES of the
+    symmetry producing it.
+    """
+    cells = [CELL_DIGITS[cell] for row in board for cell in row]
+    best = None
+    for symmetry, permutation in enumerate(SYMMETRIES):
+        code = 0
+        for cell in reversed(range(9)):
+            code = code * 3 + cells[permutation[cell]]
+        if best is None or code < best[0]:
+            best = (code, symmetry)
+    return best
+
+
+def probe(board, alpha, beta):
+    """
+    Looks the board up in the transposition table.
+
+    Returns (action, value) if the stored result settles the search
+    within (alpha, beta), else None, together with the narrowed alpha
+    and beta and the stored best action, if any.
+    """
+    global table_probes, table_hits
+    table_probes += 1
+    code, symmetry = canonical(board)
+    entry = transposition_table.get(code)
+    if entry is None:
+        return None, alpha, beta, None
+    value, bound, move = entry
+    action = None if move is None else CELLS[SYMMETRIES[symmetry][move]]
+    if bound == EXACT:
+        table_hits += 1
+        return (action, value), alpha, beta, action
+    if bound == LOWER:
+        alpha = max(alpha, value)
+    else:
+        beta = min(beta, value)
+    if alpha >= beta:
+        table_hits += 1
+        return (action, value), alpha, beta, action
+    return None, alpha, beta, action
+
+
+def store(board, value, alpha, beta, action):
+    """
+    Saves the value searched within (alpha, beta) and best action for
+    the board in the transposition table, under its canonical form.
+    """
+    if value <= alpha:
+        bound = UPPER
+    elif value >= beta:
+        bound = LOWER
+    else:
+        bound = EXACT
+    code, symmetry = canonical(board)
+    move = None
+    if action is not None:
+        move = SYMMETRIES[symmetry].index(action[0] * 3 + action[1])
+    transposition_table[code] = (value, bound, move)
+
+
+def max_value(board, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the best action for X and its value, searching with
+    alpha-beta pruning: once the value reaches `beta`, O would avoid
+    this board, so the remaining actions are skipped.
+    """
+    global nodes_visited
+    nodes_visited += 1
+    if nodes_visited % CHECK_INTERVAL == 0:
+        check_time()
 
     # If game ended, return no action
     if terminal(board):
         return None, utility(board)
 
-    v = float('-inf')
+    found, alpha, beta, first = probe(board, alpha, beta)
+    if found is not None:
+        return found
+    alpha_searched, beta_searched = alpha, beta
+
+    v = -math.inf
     best_action = None
 
-    for action in actions(board):
-        aux_action, score = min_value(result(board, action))
-        v = max(v, score)
-        # if v > score:
-        #     return aux_action, v
-        if v < score:
+    for action in ordered_actions(board, first):
+        _, score = min_value(result(board, action), alpha, beta)
+        if score > v:
             v = score
             best_action = action
+        if v >= beta:
+            record_cutoff(board, action)
+            break
+        alpha = max(alpha, v)
+
+        # Nothing beats a win
+        if v == 1:
+            break
 
-    # return action, v
+    store(board, v, alpha_searched, beta_searched, best_action)
     return best_action, v
 
 
-def min_value(board):
+def min_value(board, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the best action for O and its value, searching with
+    alpha-beta pruning: once the value drops to `alpha`, X would avoid
+    this board, so the remaining actions are skipped.
+    """
+    global nodes_visited
+    nodes_visited += 1
+    if nodes_visited % CHECK_INTERVAL == 0:
+        check_time()
 
     # If game ended, return no action
     if terminal(board):
         return None, utility(board)
 
-    v = float('inf')
+    found, alpha, beta, first = probe(board, alpha, beta)
+    if found is not None:
+        return found
+    alpha_searched, beta_searched = alpha, beta
+
+    v = math.inf
     best_action = None
 
-    for action in actions(board):
-        aux_action, score = max_value(result(board, action))
-        v = min(v, score)
-        # if v < score:
-        #     # print(aux_action, v)
-        #     return aux_action, v
-        if v > score:
+    for action in ordered_actions(board, first):
+        _, score = max_value(result(board, action), alpha, beta)
+        if score < v:
             v = score
             best_action = action
+        if v <= alpha:
+            record_cutoff(board, action)
+            break
+        beta = min(beta, v)
 
-    # return action, v
-    return best_action, v
-
+        # Nothing beats a win
+        if v == -1:
+            break
 
-# board = [[EMPTY, X, O],
-#          [O, X, X],
-#          [X, EMPTY, O]]
+    store(board, v, alpha_searched, beta_searched, best_action)
+    return best_action, v
 
-board = [[X, EMPTY, O],
-         [X, EMPTY, EMPTY],
-         [EMPTY, EMPTY, EMPTY]]
 
-minimax(board)
+opening_book = load_book()
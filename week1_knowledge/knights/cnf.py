@@ -0,0 +1,185 @@
+"""
+Conversion of logical sentences to conjunctive normal form.
+
+Each compound subsentence gets an auxiliary variable constrained to be
+equivalent to it (the Tseitin transformation), so the clauses grow
+linearly with the sentence instead of exponentially, as distributing
+Or over And would. The clauses are satisfiable exactly when the
+sentence is.
+
+Every connective is reduced to a conjunction or an equivalence of the
+literals of its operands, and auxiliary variables are hashed by that
+structure: a subsentence repeated anywhere, even written with its
+operands in another order or as Or or Implication instead of And, gets
+the one variable.
+
+Variables are numbered from 1 and literals are DIMACS-style integers:
+v for variable v and -v for its negation. The clauses are stored one
+after another in a flat array of literals.
+"""
+
+from array import array
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Array type code of the literals
+INT = "i"
+
+
+class CNF():
+
+    def __init__(self):
+        # Maps symbol names to their variables, and variables back to
+        # names (None for auxiliary variables)
+        self.variables = {}
+        self.names = [None]
+        self.num_variables = 0
+
+        # Clause i is literals[offsets[i]:offsets[i + 1]]
+        self.literals = array(INT)
+        self.offsets = array(INT, [0])
+
+        # Maps ("and", literals) and ("iff", a, b) to the auxiliary
+        # variable defined as equivalent to them
+        self.gates = {}
+
+        # Variable that is always true, created when needed
+        self.true = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def variable(self, name):
+        """
+        Returns the variable of symbol `name`, numbering it if new.
+        """
+        if name not in self.variables:
+            self.variables[name] = self.new_variable(name)
+        return self.variables[name]
+
+    def new_variable(self, name=None):
+        self.num_variables += 1
+        self.names.append(name)
+        return self.num_variables
+
+    def clause(self, i):
+        """
+        Returns the literals of clause `i`.
+        """
+        return self.literals[self.offsets[i]:self.offsets[i + 1]]
+
+    def clauses(self, start=0):
+        """
+        Yields the literals of each clause from clause `start` on.
+        """
+        for i in range(start, len(self)):
+            yield self.clause(i)
+
+    def add_clause(self, literals):
+        self.literals.extend(literals)
+        self.offsets.append(len(self.literals))
+
+    def add(self, sentence):
+        """
+        Adds clauses that can only be satisfied when `sentence` is true.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.add_clause([self.literal(disjunct)
+                             for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.add_clause([-self.literal(sentence.antecedent),
+                             self.literal(sentence.consequent)])
+        else:
+            self.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly when `sentence` is true,
+        adding the clauses defining any auxiliary variables needed.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if isinstance(sentence, And):
+            return self.define_and([self.literal(conjunct)
+                                    for conjunct in sentence.conjuncts])
+        if isinstance(sentence, Or):
+            return -self.define_and([-self.literal(disjunct)
+                                     for disjunct in sentence.disjuncts])
+        if isinstance(sentence, Implication):
+            return -self.define_and([self.literal(sentence.antecedent),
+                                     -self.literal(sentence.consequent)])
+        if isinstance(sentence, Biconditional):
+            return self.define_iff(self.literal(sentence.left),
+                                   self.literal(sentence.right))
+        raise TypeError("must be a logical sentence")
+
+    def define_and(self, literals):
+        """
+        Returns a literal equivalent to the conjunction of `literals`.
+        """
+        literals = sorted(set(literals), key=abs)
+        if any(-literal in literals for literal in literals):
+            return -self.true_literal()
+        if not literals:
+            return self.true_literal()
+        if len(literals) == 1:
+            return literals[0]
+
+        key = ("and", tuple(literals))
+        if key not in self.gates:
+            x = self.new_variable()
+            for literal in literals:
+                self.add_clause([-x, literal])
+            self.add_clause([x] + [-literal for literal in literals])
+            self.gates[key] = x
+        return self.gates[key]
+
+    def define_iff(self, a, b):
+        """
+        Returns a literal equivalent to `a` <=> `b`.
+        """
+        if a == b:
+            return self.true_literal()
+        if a == -b:
+            return -self.true_literal()
+
+        # a <=> b is the same as -a <=> -b and the negation of a <=> -b
+        sign = 1
+        if a < 0:
+            a, sign = -a, -sign
+        if b < 0:
+            b, sign = -b, -sign
+        a, b = min(a, b), max(a, b)
+
+        key = ("iff", a, b)
+        if key not in self.gates:
+            x = self.new_variable()
+            self.add_clause([-x, -a, b])
+            self.add_clause([-x, a, -b])
+            self.add_clause([x, a, b])
+            self.add_clause([x, -a, -b])
+            self.gates[key] = x
+        return sign * self.gates[key]
+
+    def true_literal(self):
+        if self.true is None:
+            self.true = self.new_variable()
+            self.add_clause([self.true])
+        return self.true
+
+    def dimacs(self):
+        """
+        Returns the clauses in DIMACS CNF format, with a comment naming
+        the variable of each symbol.
+        """
+        lines = [f"c {variable} {name}"
+                 for name, variable in self.variables.items()]
+        lines.append(f"p cnf {self.num_variables} {len(self)}")
+        for clause in self.clauses():
+            lines.append(" ".join(map(str, clause)) + " 0")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+"""
+Compiled, bit-parallel evaluation of logical sentences.
+
+A Program lowers sentences to a flat list of instructions over numbered
+registers, the first of which hold the symbols. Running it evaluates
+many models at once: every register is an integer whose bit k is the
+value in model k, so each instruction is a single bitwise operation on
+Python's arbitrarily wide integers. Repeated subsentences compile to a
+single instruction.
+
+`entails` checks every model this way, 2 ** BLOCK_BITS models per run.
+"""
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Instruction opcodes
+NOT, AND, OR, IMPLIES, IFF = range(5)
+
+# Symbols enumerated within a run, so that each run checks 2 ** BLOCK_BITS
+# models
+BLOCK_BITS = 16
+
+
+class Program():
+
+    def __init__(self, symbols):
+        """
+        Creates an empty program whose first registers hold the symbols
+        named in `symbols`, in order.
+        """
+        self.symbols = list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+
+        # Each instruction is (opcode, operand registers), and writes
+        # register len(symbols) + its position
+        self.instructions = []
+        self.registers = {}
+
+    def compile(self, sentence):
+        """
+        Adds the instructions evaluating `sentence`, returning the
+        register holding its value.
+        """
+        if isinstance(sentence, Symbol):
+            try:
+                return self.index[sentence.name]
+            except KeyError:
+                raise Exception(f"variable {sentence.name} not in model")
+        if isinstance(sentence, Not):
+            return self.emit(NOT, self.compile(sentence.operand))
+        if isinstance(sentence, And):
+            return self.emit(AND, *[self.compile(conjunct)
+                                    for conjunct in sentence.conjuncts])
+        if isinstance(sentence, Or):
+            return self.emit(OR, *[self.compile(disjunct)
+                                   for disjunct in sentence.disjuncts])
+        if isinstance(sentence, Implication):
+            return self.emit(IMPLIES, self.compile(sentence.antecedent),
+                             self.compile(sentence.consequent))
+        if isinstance(sentence, Biconditional):
+            return self.emit(IFF, self.compile(sentence.left),
+                             self.compile(sentence.right))
+        raise TypeError("must be a logical sentence")
+
+    def emit(self, opcode, *operands):
+        """
+        Returns the register of instruction (opcode, operands), adding
+        the instruction unless the program already has it.
+        """
+        instruction = (opcode, operands)
+        if instruction not in self.registers:
+            self.registers[instruction] = (len(self.symbols)
+                                           + len(self.instructions))
+            self.instructions.append(instruction)
+        return self.registers[instruction]
+
+    def run(self, inputs, mask):
+        """
+        Returns the value of every register when the symbols hold
+        `inputs`, evaluating the models of the bits set in `mask`.
+        """
+        registers = list(inputs)
+        for opcode, operands in self.instructions:
+            if opcode == NOT:
+                value = mask ^ registers[operands[0]]
+            elif opcode == AND:
+                value = mask
+                for operand in operands:
+                    value &= registers[operand]
+            elif opcode == OR:
+                value = 0
+                for operand in operands:
+                    value |= registers[operand]
+            elif opcode == IMPLIES:
+                value = ((mask ^ registers[operands[0]])
+                         | registers[operands[1]])
+            else:
+                value = mask ^ registers[operands[0]] ^ registers[operands[1]]
+            registers.append(value)
+        return registers
+
+    def evaluate(self, register, models):
+        """
+        Returns the value of `register` in each of `models`, dictionaries
+        mapping symbol names to values, as a list of booleans.
+        """
+        inputs = [0] * len(self.symbols)
+        for k, model in enumerate(models):
+            for i, name in enumerate(self.symbols):
+                try:
+                    if model[name]:
+                        inputs[i] |= 1 << k
+                except KeyError:
+                    raise Exception(f"variable {name} not in model")
+        result = self.run(inputs, (1 << len(models)) - 1)[register]
+        return [bool(result >> k & 1) for k in range(len(models))]
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both in every
+    model, a block of models at a time.
+    """
+    program = Program(sorted(set.union(knowledge.symbols(), query.symbols())))
+    knowledge_register = program.compile(knowledge)
+    query_register = program.compile(query)
+
+    # The first symbols take every combination of values within a run,
+    # the others one combination per run
+    inner = min(len(program.symbols), BLOCK_BITS)
+    outer = len(program.symbols) - inner
+    width = 1 << inner
+    mask = (1 << width) - 1
+    columns = [column(i, width) for i in range(inner)]
+    for block in range(1 << outer):
+        inputs = columns + [mask if block >> j & 1 else 0
+                            for j in range(outer)]
+        registers = program.run(inputs, mask)
+        if registers[knowledge_register] & ~registers[query_register] & mask:
+            return False
+    return True
+
+
+def column(i, width):
+    """
+    Returns the `width`-bit integer whose bit k is bit i of k, the values
+    of symbol i across all models of the first symbols.
+    """
+    run = 1 << i
+    period = 2 * run
+    unit = ((1 << run) - 1) << run
+    repeat = ((1 << width) - 1) // ((1 << period) - 1)
+    return unit * repeat
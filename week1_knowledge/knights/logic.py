@@ -1,8 +1,28 @@
 import itertools
+import weakref
+
+# Maps the structure of every interned sentence, its class and interned
+# operands, to the one node shared by all sentences with that structure
+interned = weakref.WeakValueDictionary()
 
 
 class Sentence():
 
+    # Hash, symbols and whether the sentence contains an And, which
+    # And.add can change, or None until computed
+    cached = None
+
+    # Weak references to the sentences whose cached values were computed
+    # from this one's, by id since equal sentences can be distinct,
+    # kept for sentences that contain an And so that And.add can drop them
+    dependents = None
+
+    # Key of the sentence in `interned`, if it was interned
+    intern_key = None
+
+    def __hash__(self):
+        return self.cache()[0]
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
@@ -13,7 +33,83 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.cache()[1])
+
+    def operands(self):
+        """Returns the sentences the logical sentence is made of."""
+        return ()
+
+    def structure_hash(self):
+        """Computes the hash of the sentence from its operands' hashes."""
+        raise Exception("nothing to hash")
+
+    def structure_symbols(self):
+        """Computes the symbols of the sentence from its operands'."""
+        return frozenset().union(
+            *[operand.cache()[1] for operand in self.operands()]
+        )
+
+    def structure_mutable(self):
+        """Checks if the sentence contains an And."""
+        return any(operand.cache()[2] for operand in self.operands())
+
+    def cache(self):
+        """
+        Returns (hash, frozenset of symbols, whether it contains an And)
+        of the sentence, computed once until an And in it changes.
+        """
+        if self.cached is None:
+            self.cached = (self.structure_hash(), self.structure_symbols(),
+                           self.structure_mutable())
+            for operand in self.operands():
+                operand.depend(self)
+        return self.cached
+
+    def depend(self, sentence):
+        """
+        Records that the cached values of `sentence` were computed from
+        this sentence's, if this one can change.
+        """
+        if self.cache()[2]:
+            if self.dependents is None:
+                self.dependents = {}
+            self.dependents[id(sentence)] = weakref.ref(sentence)
+
+    def invalidate(self):
+        """
+        Drops the cached values of the sentence and of every sentence
+        they were used to compute.
+        """
+        if self.cached is None:
+            return
+        self.cached = None
+        dependents, self.dependents = self.dependents, None
+        for reference in (dependents or {}).values():
+            sentence = reference()
+            if sentence is not None:
+                sentence.invalidate()
+
+    def intern(self):
+        """
+        Returns the node shared by every interned sentence structurally
+        identical to this one, interning its operands first, so that
+        equal subsentences are one object whose hash and symbols are
+        computed once.
+        """
+        if (self.intern_key is not None
+                and interned.get(self.intern_key) is self):
+            return self
+        operands = tuple(operand.intern() for operand in self.operands())
+        key = (type(self), operands)
+        node = interned.get(key)
+        if node is None:
+            if all(a is b for a, b in zip(operands, self.operands())):
+                node = self
+            else:
+                node = type(self)(*operands)
+            node.intern_key = key
+            interned[key] = node
+        return node
 
     @classmethod
     def validate(cls, sentence):
@@ -50,9 +146,14 @@ class Symbol(Sentence):
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def structure_hash(self):
         return hash(("symbol", self.name))
 
+    def structure_symbols(self):
+        return frozenset([self.name])
+
     def __repr__(self):
         return self.name
 
@@ -65,8 +166,14 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def intern(self):
+        key = (Symbol, self.name)
+        node = interned.get(key)
+        if node is None:
+            node = self
+            node.intern_key = key
+            interned[key] = node
+        return node
 
 
 class Not(Sentence):
@@ -75,9 +182,13 @@ class Not(Sentence):
         self.operand = operand
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (isinstance(other, Not)
+                                 and hash(self) == hash(other)
+                                 and self.operand == other.operand)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def structure_hash(self):
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -89,8 +200,8 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def operands(self):
+        return (self.operand,)
 
 
 class And(Sentence):
@@ -100,12 +211,18 @@ class And(Sentence):
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (isinstance(other, And)
+                                 and hash(self) == hash(other)
+                                 and self.conjuncts == other.conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    __hash__ = Sentence.__hash__
+
+    def structure_hash(self):
+        self.conjunct_hashes = [hash(conjunct) for conjunct in self.conjuncts]
+        return hash(("and", tuple(self.conjunct_hashes)))
+
+    def structure_mutable(self):
+        return True
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -115,8 +232,25 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        cached = self.cached
         self.conjuncts.append(conjunct)
 
+        # The sentences computed from this one are now stale, and its
+        # interned structure is gone
+        self.invalidate()
+        if self.intern_key is not None:
+            if interned.get(self.intern_key) is self:
+                del interned[self.intern_key]
+            self.intern_key = None
+
+        # Extend the values of the other conjuncts rather than compute
+        # them all again
+        if cached is not None:
+            self.conjunct_hashes.append(hash(conjunct))
+            self.cached = (hash(("and", tuple(self.conjunct_hashes))),
+                           cached[1] | conjunct.cache()[1], True)
+            conjunct.depend(self)
+
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
@@ -126,8 +260,8 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def operands(self):
+        return tuple(self.conjuncts)
 
 
 class Or(Sentence):
@@ -137,9 +271,13 @@ class Or(Sentence):
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (isinstance(other, Or)
+                                 and hash(self) == hash(other)
+                                 and self.disjuncts == other.disjuncts)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def structure_hash(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -157,8 +295,8 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def operands(self):
+        return tuple(self.disjuncts)
 
 
 class Implication(Sentence):
@@ -169,11 +307,14 @@ class Implication(Sentence):
         self.consequent = consequent
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and hash(self) == hash(other)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def structure_hash(self):
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -188,8 +329,8 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def operands(self):
+        return (self.antecedent, self.consequent)
 
 
 class Biconditional(Sentence):
@@ -200,11 +341,14 @@ class Biconditional(Sentence):
         self.right = right
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and hash(self) == hash(other)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def structure_hash(self):
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -221,12 +365,26 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def operands(self):
+        return (self.left, self.right)
+
+
+# How model_check decides entailment: "enumerate" evaluates the knowledge
+# base in every model, "compiled" does too but many models at a time
+# with compiled.py, and "sat" searches for a model of the knowledge base
+# where the query is false with the solver in sat.py
+ENGINE = "enumerate"
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
+    if ENGINE == "sat":
+        return sat_check(knowledge, query)
+    if ENGINE == "compiled":
+        from compiled import entails
+        return entails(knowledge, query)
+    if ENGINE != "enumerate":
+        raise ValueError(f"unknown engine {ENGINE}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -261,3 +419,63 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by checking that knowledge
+    base and not query cannot both be true.
+    """
+    return KnowledgeBase(knowledge).ask(query)
+
+
+class KnowledgeBase():
+    """
+    A knowledge base kept as clauses in a SAT solver, to be asked many
+    queries.
+
+    Each query is solved under the assumption that it is false, so
+    nothing is added to the clauses but definitions of the query's
+    subsentences, and everything the solver learns while answering
+    helps answer later queries. Sentences told after queries are added
+    to the same solver.
+    """
+
+    def __init__(self, *sentences):
+        from cnf import CNF
+        from sat import Solver
+
+        self.formula = CNF()
+        self.solver = Solver()
+
+        # Number of clauses of the formula given to the solver so far
+        self.added = 0
+
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.formula.add(sentence)
+        self.update()
+
+    def ask(self, query):
+        """Checks if knowledge base entails query."""
+        Sentence.validate(query)
+        literal = self.formula.literal(query)
+        self.update()
+        return not self.solver.solve([-literal])
+
+    def consistent(self):
+        """Checks if the sentences told can all be true."""
+        return self.solver.solve()
+
+    def update(self):
+        """
+        Gives the solver the clauses added to the formula since the
+        last update.
+        """
+        for clause in self.formula.clauses(self.added):
+            self.solver.add_clause(clause)
+        self.added = len(self.formula)
@@ -0,0 +1,355 @@
+"""
+A conflict-driven clause learning (CDCL) SAT solver.
+
+Clauses are lists of DIMACS-style literals (v or -v for variable v,
+numbered from 1). The solver propagates unit clauses by watching two
+literals of each clause, branches on the variable most involved in
+recent conflicts (VSIDS) with its last value, learns a clause from
+every conflict, and restarts on the Luby sequence. `solve` can be
+given assumptions, literals taken as true for that call only, so the
+same solver, with the clauses it has learned, can answer many queries.
+"""
+
+import heapq
+
+# Values of literals
+TRUE, FALSE, UNASSIGNED = 1, -1, 0
+
+# Conflicts per unit of the Luby restart sequence
+RESTART_BASE = 100
+
+# Factor dividing variable activities after every conflict
+ACTIVITY_DECAY = 0.95
+
+
+class Solver():
+
+    def __init__(self, num_variables=0):
+        # Literals are coded internally as 2v for v and 2v + 1 for -v,
+        # so that indexing by literal needs no dictionary
+        self.num_variables = 0
+        self.values = [UNASSIGNED, UNASSIGNED]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.watches = [[], []]
+
+        self.clauses = []
+        self.learnts = []
+
+        # Assigned literals in order, with the trail position where
+        # each decision level starts, and the next literal to propagate
+        self.trail = []
+        self.trail_limits = []
+        self.propagated = 0
+
+        self.activity_increment = 1.0
+        self.order = []
+
+        # False once the clauses are known to be unsatisfiable
+        self.ok = True
+
+        # Statistics over all calls to solve
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+        while self.num_variables < num_variables:
+            self.new_variable()
+
+    def new_variable(self):
+        """
+        Returns a new variable.
+        """
+        self.num_variables += 1
+        self.values.extend([UNASSIGNED, UNASSIGNED])
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        self.watches.extend([[], []])
+        heapq.heappush(self.order, (0.0, self.num_variables))
+        return self.num_variables
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, returning False if the clauses have become
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+
+        clause = []
+        for literal in literals:
+            while abs(literal) > self.num_variables:
+                self.new_variable()
+            code = encode(literal)
+            value = self.values[code]
+            if value == TRUE or code ^ 1 in clause:
+                return True
+            if value == UNASSIGNED and code not in clause:
+                clause.append(code)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses, with every literal in `assumptions`
+        taken as true, are satisfiable, in which case `model` holds a
+        satisfying value for each variable.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        for literal in assumptions:
+            while abs(literal) > self.num_variables:
+                self.new_variable()
+        assumptions = [encode(literal) for literal in assumptions]
+
+        restarts = 0
+        while True:
+            status = self.search(RESTART_BASE * luby(restarts), assumptions)
+            if status is not None:
+                self.cancel_until(0)
+                return status
+            restarts += 1
+
+    def search(self, max_conflicts, assumptions):
+        """
+        Runs the CDCL loop until the clauses are solved, returning True
+        or False, or until `max_conflicts` conflicts, returning None.
+        """
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.attach(learnt)
+                    self.learnts.append(learnt)
+                    self.assign(learnt[0], learnt)
+                self.decay_activity()
+                continue
+
+            if conflicts >= max_conflicts:
+                self.cancel_until(0)
+                return None
+
+            # Assumptions are decided first, one level each
+            decision = None
+            while len(self.trail_limits) < len(assumptions):
+                literal = assumptions[len(self.trail_limits)]
+                if self.values[literal] == TRUE:
+                    self.trail_limits.append(len(self.trail))
+                elif self.values[literal] == FALSE:
+                    return False
+                else:
+                    decision = literal
+                    break
+
+            if decision is None:
+                decision = self.pick_branch_literal()
+                if decision is None:
+                    self.model = [None] + [
+                        self.values[2 * variable] == TRUE
+                        for variable in range(1, self.num_variables + 1)
+                    ]
+                    return True
+                self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.assign(decision, None)
+
+    def propagate(self):
+        """
+        Assigns the literals forced by unit clauses, returning a clause
+        whose literals are all false, or None.
+        """
+        values = self.values
+        while self.propagated < len(self.trail):
+            false_literal = self.trail[self.propagated] ^ 1
+            self.propagated += 1
+            self.propagations += 1
+
+            watchers = self.watches[false_literal]
+            kept = []
+            conflict = None
+            for position, clause in enumerate(watchers):
+                # Keep the false literal second
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                if values[first] == TRUE:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    if values[clause[k]] != FALSE:
+                        clause[1], clause[k] = clause[k], false_literal
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[first] == FALSE:
+                        conflict = clause
+                        kept.extend(watchers[position + 1:])
+                        break
+                    self.assign(first, clause)
+
+            self.watches[false_literal] = kept
+            if conflict is not None:
+                self.propagated = len(self.trail)
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, cutting at the first
+        unique implication point, with the literal it asserts first and
+        a literal of the level to backtrack to second, and that level.
+        """
+        seen = set()
+        learnt = [None]
+        level = len(self.trail_limits)
+        pending = 0
+        position = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for other in clause if literal is None else clause[1:]:
+                variable = other >> 1
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learnt.append(other)
+
+            # The most recent assignment involved in the conflict
+            while self.trail[position] >> 1 not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            clause = self.reasons[literal >> 1]
+            pending -= 1
+            if pending == 0:
+                break
+            seen.discard(literal >> 1)
+
+        learnt[0] = literal ^ 1
+        if len(learnt) == 1:
+            return learnt, 0
+
+        # Watch a literal of the highest remaining level second
+        highest = max(range(1, len(learnt)),
+                      key=lambda i: self.levels[learnt[i] >> 1])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, self.levels[learnt[1] >> 1]
+
+    def assign(self, literal, reason):
+        variable = literal >> 1
+        self.values[literal] = TRUE
+        self.values[literal ^ 1] = FALSE
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def cancel_until(self, level):
+        """
+        Undoes the assignments made above decision level `level`.
+        """
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = literal >> 1
+            self.values[literal] = UNASSIGNED
+            self.values[literal ^ 1] = UNASSIGNED
+            self.reasons[variable] = None
+            self.phases[variable] = not literal & 1
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.propagated = len(self.trail)
+
+        # Drop the stale heap entries once they outnumber the variables
+        if len(self.order) > 4 * self.num_variables + 100:
+            self.order = [(-self.activity[variable], variable)
+                          for variable in range(1, self.num_variables + 1)
+                          if self.values[2 * variable] == UNASSIGNED]
+            heapq.heapify(self.order)
+
+    def attach(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def pick_branch_literal(self):
+        """
+        Returns the unassigned variable of highest activity as a
+        literal with its saved phase, or None if all are assigned.
+        """
+        while self.order:
+            activity, variable = heapq.heappop(self.order)
+
+            # Skip entries left behind by later bumps
+            if -activity != self.activity[variable]:
+                continue
+            if self.values[2 * variable] == UNASSIGNED:
+                return 2 * variable + (not self.phases[variable])
+        return None
+
+    def bump(self, variable):
+        self.activity[variable] += self.activity_increment
+        if self.activity[variable] > 1e100:
+            for other in range(1, self.num_variables + 1):
+                self.activity[other] *= 1e-100
+            self.activity_increment *= 1e-100
+            self.order = [(-self.activity[other], other)
+                          for other in range(1, self.num_variables + 1)]
+            heapq.heapify(self.order)
+        elif self.values[2 * variable] == UNASSIGNED:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def decay_activity(self):
+        self.activity_increment /= ACTIVITY_DECAY
+
+
+def encode(literal):
+    """
+    Returns the internal code of DIMACS-style literal `literal`.
+    """
+    return 2 * literal if literal > 0 else -2 * literal + 1
+
+
+def luby(i):
+    """
+    Returns term `i` (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    """
+    size, exponent = 1, 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        exponent -= 1
+        i %= size
+    return 2 ** exponent
@@ -2,6 +2,11 @@ import math
 import random
 import time
 
+import instrument
+
+# Labels of this engine's counters when instrumentation is on
+ENGINE_LABELS = (("engine", "nim"),)
+
 
 class Nim():
 
@@ -66,6 +71,8 @@ class Nim():
         self.switch_player()
 
         # Check for a winner
+        if instrument.recorder is not None:
+            instrument.recorder.count("terminal_checks_total", ENGINE_LABELS)
         if all(pile == 0 for pile in self.piles):
             self.winner = self.player
 
@@ -107,6 +114,11 @@ class NimAI():
         # Key
         key = (state_tup, action)
 
+        if instrument.recorder is not None:
+            instrument.recorder.count("cache_lookups_total", ENGINE_LABELS)
+            if key in self.q:
+                instrument.recorder.count("cache_hits_total", ENGINE_LABELS)
+
         # If the (state,action) key is not found in dictionary, return 0
         # if it is found, return its value
         return self.q.get(key, 0)
@@ -155,6 +167,10 @@ class NimAI():
         if not possible_actions:
             return 0
 
+        if instrument.recorder is not None:
+            instrument.recorder.count("nodes_expanded_total", ENGINE_LABELS,
+                                      len(possible_actions))
+
         # Initialize max value
         max_value = -float('inf')
 
@@ -183,6 +199,24 @@ class NimAI():
         If multiple actions have the same Q-value, any of those
         options is an acceptable return value.
         """
+        recorder = instrument.recorder
+        if recorder is None:
+            return self.find_action(state, epsilon)
+
+        # Time the move by the number of objects left, as plies are not
+        # known from the state
+        recorder.start_span("choose_action")
+        try:
+            return self.find_action(state, epsilon)
+        finally:
+            seconds = recorder.end_span()
+            recorder.observe("move", seconds,
+                             ENGINE_LABELS + (("objects", sum(state)),))
+
+    def find_action(self, state, epsilon=True):
+        """
+        Returns the action choose_action chooses for `state`.
+        """
         # Get the possible actions
         possible_actions = Nim.available_actions(state)
 
@@ -208,11 +242,17 @@ def train(n):
     """
 
     player = NimAI()
+    recorder = instrument.recorder
+    if recorder is not None:
+        recorder.start_span("nim")
+        recorder.start_span("train")
 
     # Play n games
     for i in range(n):
         print(f"Playing training game {i + 1}")
         game = Nim()
+        if recorder is not None:
+            recorder.start_span("game")
 
         # Keep track of last move made by either player
         last = {
@@ -255,6 +295,12 @@ def train(n):
                     0
                 )
 
+        if recorder is not None:
+            recorder.end_span()
+    if recorder is not None:
+        recorder.end_span()
+        recorder.end_span()
+
     print("Done training")
 
     # Return the trained AI